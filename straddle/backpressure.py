@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from collections import Counter, deque
+from . import metrics
+
+
+# Totals across every connection, for monitoring.
+totals = Counter()
+
+metrics.Counter("straddle_frames_sent_total", "Frames sent to WebSocket clients.", func=lambda: totals["sent"])
+metrics.Counter("straddle_frames_coalesced_total", "Queued frames replaced by a newer one for a slow client.",
+                func=lambda: totals["coalesced"])
+metrics.Counter("straddle_frames_dropped_total", "Queued frames dropped for a slow client.",
+                func=lambda: totals["dropped"])
+
+
+class OutboundQueue:
+    """Per-connection send queue that coalesces when the client falls behind.
+
+    Items are queued with a key (the index they belong to) and sent in
+    order by a single sender task, so whoever enqueues never waits on a
+    slow client. Once more than `max_depth` items are waiting, the queue
+    keeps only the latest item per key (latest value wins); if that is
+    still too deep the oldest keys are dropped.
+    """
+
+    def __init__(self, send, max_depth):
+        self._send = send
+        self.max_depth = max_depth
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._items = deque()
+        self._ready = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, key, item):
+        self._items.append((key, item))
+        if len(self._items) > self.max_depth:
+            self._coalesce()
+        self._ready.set()
+
+    def _coalesce(self):
+        latest = {}
+        for key, item in self._items:
+            latest.pop(key, None)
+            latest[key] = item
+        coalesced = len(self._items) - len(latest)
+        dropped = max(len(latest) - self.max_depth, 0)
+
+        self._items = deque(list(latest.items())[dropped:])
+        self.coalesced += coalesced
+        self.dropped += dropped
+        totals.update(coalesced=coalesced, dropped=dropped)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._items:
+                _, item = self._items.popleft()
+                try:
+                    await self._send(item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(f"WebSocket Send Error: {e}")
+                    continue
+                self.sent += 1
+                totals["sent"] += 1
+
+    def stats(self):
+        return {"depth": len(self), "sent": self.sent, "coalesced": self.coalesced, "dropped": self.dropped}
@@ -0,0 +1,288 @@
+import sys
+import json
+import time
+import random
+import asyncio
+from collections import defaultdict
+import numpy as np
+from channels.layers import get_channel_layer
+from django.utils import timezone
+from .backpressure import OutboundQueue
+from .hub import BroadcastHub, encode_tick, group_for
+from .indices import INDEX_KEYS, INSTRUMENTS
+from .wire import TickEncoder
+
+
+def sample_payload():
+    """A poller-shaped payload with slightly moving prices for every index."""
+    payload = {"timestamp": time.strftime("%H:%M:%S"), "ts": time.time()}
+    for i, instrument in enumerate(INSTRUMENTS.values()):
+        ltp = 20000 + 1000 * i + random.uniform(-25, 25)
+        call_price = 100 + random.uniform(-5, 5)
+        put_price = 100 + random.uniform(-5, 5)
+        payload[instrument.key] = {
+            "atm_strike": instrument.atm_strike(ltp),
+            "call_price": round(call_price, 2),
+            "put_price": round(put_price, 2),
+            "straddle_price": round(call_price + put_price, 2),
+            "ltp": round(ltp, 2),
+        }
+    return payload
+
+
+async def fanout_once(clients, ticks, mode):
+    """CPU time per tick to deliver `ticks` ticks of every index to `clients` clients.
+
+    "hub" encodes each tick once and hands the same Tick to every queue;
+    "per_client" encodes it separately for each client, as the poller did
+    before the hub existed.
+    """
+    async def send(tick):
+        # Stand-in for StraddleConsumer.send_tick without a real socket.
+        return tick.delta if tick.seq > 1 else tick.full
+
+    hub = BroadcastHub()
+    queues = [OutboundQueue(send, max_depth=len(INDEX_KEYS) * 4) for _ in range(clients)]
+    encoders = [TickEncoder() for _ in range(clients)]
+    for queue in queues:
+        queue.start()
+        for index_type in INDEX_KEYS:
+            hub.add(index_type, queue)
+
+    encoder = TickEncoder()
+    start = time.process_time()
+    for _ in range(ticks):
+        payload = sample_payload()
+        for index_type in INDEX_KEYS:
+            if mode == "hub":
+                hub.publish(encode_tick(encoder, index_type, payload))
+            else:
+                for queue, client_encoder in zip(queues, encoders):
+                    queue.put(index_type, encode_tick(client_encoder, index_type, payload))
+        while any(len(queue) for queue in queues):
+            await asyncio.sleep(0)
+    cpu = time.process_time() - start
+
+    for queue in queues:
+        await queue.close()
+    return {
+        "benchmark": "fanout",
+        "mode": mode,
+        "clients": clients,
+        "ticks": ticks,
+        "cpu_ms_per_tick": cpu / ticks * 1000,
+    }
+
+
+def bench_fanout(client_counts=(1, 10, 100, 1000), ticks=100):
+    results = []
+    for clients in client_counts:
+        for mode in ("per_client", "hub"):
+            results.append(asyncio.run(fanout_once(clients, ticks, mode)))
+    return results
+
+
+def summarize(samples_ms):
+    """Latency summary of a list of millisecond samples."""
+    samples = np.asarray(samples_ms, dtype=float)
+    if not len(samples):
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "n": len(samples),
+        "mean_ms": float(samples.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(samples.max()),
+    }
+
+
+async def pipeline_once(ticks, latency, index_types):
+    """Drive the real poller against a SyntheticProvider, timing every stage of a tick.
+
+    Stages: spot_fetch and option_fetch (the batched quotes calls, including
+    the limiter and executor hop), compute (building, buffering and
+    remembering the tick), serialize (encoding every index's Tick), send
+    (hub publish until one client's outbound queue is drained) and db_write
+    (each bulk insert done by the write-behind buffer).
+    """
+    from .poller import StraddlePoller
+    from .providers import SyntheticProvider
+    from .ratelimit import RateLimiter
+
+    timings = defaultdict(list)
+    poller = StraddlePoller(provider=SyntheticProvider(latency=latency, jitter=0, seed=1))
+    poller.limiter = RateLimiter(limits=())
+
+    fetch_quotes, record, write = poller.fetch_quotes, poller.record, poller.writer.write
+
+    async def timed_fetch(symbols, kind="spot"):
+        start = time.perf_counter()
+        quotes = await fetch_quotes(symbols, kind)
+        timings[f"{kind}_fetch"].append((time.perf_counter() - start) * 1000)
+        return quotes
+
+    def timed_record(results, now):
+        start = time.perf_counter()
+        payload = record(results, now)
+        timings["compute"].append((time.perf_counter() - start) * 1000)
+        return payload
+
+    def timed_write(rows):
+        start = time.perf_counter()
+        write(rows)
+        timings["db_write"].append((time.perf_counter() - start) * 1000)
+
+    poller.fetch_quotes, poller.record, poller.writer.write = timed_fetch, timed_record, timed_write
+
+    async def send(tick):
+        return tick.full
+
+    hub = BroadcastHub()
+    queue = OutboundQueue(send, max_depth=len(index_types) * 4)
+    queue.start()
+    for index_type in index_types:
+        hub.add(index_type, queue)
+
+    poller.writer.start()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tick_start = time.perf_counter()
+        payload = await poller.poll_once(index_types)
+
+        serialize_start = time.perf_counter()
+        encoded = [encode_tick(poller.encoder, index_type, payload) for index_type in index_types]
+        send_start = time.perf_counter()
+        for tick in encoded:
+            hub.publish(tick)
+        while len(queue):
+            await asyncio.sleep(0)
+        end = time.perf_counter()
+
+        timings["serialize"].append((send_start - serialize_start) * 1000)
+        timings["send"].append((end - send_start) * 1000)
+        timings["tick"].append((end - tick_start) * 1000)
+    elapsed = time.perf_counter() - start
+    await poller.writer.stop()
+    await queue.close()
+
+    return {
+        "benchmark": "pipeline",
+        "ticks": ticks,
+        "indices": len(index_types),
+        "provider_latency_ms": latency * 1000,
+        "ticks_per_s": ticks / elapsed,
+        "rows_written": poller.writer.flushed,
+        "stages": {stage: summarize(samples) for stage, samples in timings.items()},
+    }
+
+
+def bench_pipeline(ticks=200, latency=0.0, index_types=INDEX_KEYS):
+    return [asyncio.run(pipeline_once(ticks, latency, list(index_types)))]
+
+
+def bench_db_inserts(rows=6000, batch_sizes=(1, 60, 600)):
+    """Rows per second persisted through TickWriter.write at several batch sizes."""
+    from .models import StraddlePrice
+    from .persistence import TickWriter
+
+    writer = TickWriter()
+    index_types = list(INDEX_KEYS)
+    results = []
+    for batch_size in batch_sizes:
+        now = timezone.now()
+        objects = [
+            StraddlePrice(
+                timestamp=now,
+                index_name=index_types[i % len(index_types)],
+                atm_strike=22000,
+                call_price=100.0,
+                put_price=100.0,
+                straddle_price=200.0,
+                ltp=22000.0,
+            )
+            for i in range(rows)
+        ]
+        start = time.perf_counter()
+        for i in range(0, rows, batch_size):
+            writer.write(objects[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        results.append({
+            "benchmark": "db_insert",
+            "rows": rows,
+            "batch_size": batch_size,
+            "rows_per_s": rows / elapsed,
+            "ms_per_batch": elapsed * 1000 / -(-rows // batch_size),
+        })
+    return results
+
+
+async def websocket_fanout_once(clients, ticks, encoding):
+    """Deliver ticks to `clients` real StraddleConsumers through the channel layer and hub.
+
+    Each client is a Channels WebsocketCommunicator; a tick's latency runs
+    from its group_send until every client has received every index.
+    """
+    from channels.routing import URLRouter
+    from channels.testing import WebsocketCommunicator
+    from .routing import websocket_urlpatterns
+
+    application = URLRouter(websocket_urlpatterns)
+    communicators = []
+    for _ in range(clients):
+        communicator = WebsocketCommunicator(application, f"/ws/straddle/?encoding={encoding}")
+        connected, _ = await communicator.connect(timeout=30)
+        if not connected:
+            raise RuntimeError("WebSocket benchmark client failed to connect.")
+        # The binary schema (if any) and the history snapshot arrive first.
+        for _ in range(2 if encoding == "binary" else 1):
+            await communicator.receive_output(timeout=30)
+        communicators.append(communicator)
+
+    channel_layer = get_channel_layer()
+    encoder = TickEncoder()
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(ticks):
+        payload = sample_payload()
+        start = time.perf_counter()
+        for index_type in INDEX_KEYS:
+            await channel_layer.group_send(group_for(index_type), encode_tick(encoder, index_type, payload).message())
+        for communicator in communicators:
+            for _ in INDEX_KEYS:
+                await communicator.receive_output(timeout=30)
+        latencies.append((time.perf_counter() - start) * 1000)
+    cpu = time.process_time() - cpu_start
+
+    for communicator in communicators:
+        await communicator.disconnect()
+    return {
+        "benchmark": "websocket_fanout",
+        "encoding": encoding,
+        "clients": clients,
+        "ticks": ticks,
+        "cpu_ms_per_tick": cpu / ticks * 1000,
+        "tick": summarize(latencies),
+    }
+
+
+def bench_websocket(client_counts=(1, 100, 1000), ticks=20, encoding="binary"):
+    from django.test import override_settings
+
+    # Clients must not start the embedded poller; the benchmark publishes the ticks itself.
+    with override_settings(STRADDLE_EMBEDDED_POLLER=False):
+        return [asyncio.run(websocket_fanout_once(clients, ticks, encoding)) for clients in client_counts]
+
+
+def environment():
+    return {"python": sys.version.split()[0], "numpy": np.__version__, "started": time.time()}
+
+
+def dump(results, path=None):
+    """Write results as JSON to `path`, or return them as a JSON string."""
+    text = json.dumps(results, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    return text
@@ -1,376 +1,151 @@
-import os
 import json
-import asyncio
-import datetime
+import time
 import logging
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
 from channels.generic.websocket import AsyncWebsocketConsumer
-from fyers_apiv3 import fyersModel
-from dotenv import load_dotenv
-from .models import StraddlePrice
+from django.conf import settings
+from .poller import poller
+from .indices import INDEX_KEYS
+from .history import ring_snapshot, db_snapshot
+from . import wire
+from .backpressure import OutboundQueue
+from .hub import hub
+from .metrics import SEND, TICK_AGE, CONNECTED_CLIENTS
 
 
-
-
-load_dotenv()
-
-ACCESS_TOKEN = os.getenv("FYERS_ACCESS_TOKEN")
-CLIENT_ID = os.getenv("FYERS_CLIENT_ID")
-
-if not ACCESS_TOKEN or not CLIENT_ID:
-    raise ValueError("Missing Fyers API credentials. Check your .env file.")
-
-fyers = fyersModel.FyersModel(client_id=CLIENT_ID, token=ACCESS_TOKEN, is_async=False)
-
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-
-price_history = {"timestamps": [], "nifty_straddle": [], "sensex_straddle": [],"bankex_straddle":[],"finnifty_straddle":[],"midcapnifty_straddle":[],"banknifty_straddle":[]}
 logger = logging.getLogger(__name__)
 
 class StraddleConsumer(AsyncWebsocketConsumer):
+    # Ticks arrive through the process-wide hub, so consumers need no channel of
+    # their own (which a cross-process layer would otherwise poll per connection).
+    channel_layer_alias = None
+
     async def connect(self):
         """Handle WebSocket connection."""
+        params = parse_qs(self.scope.get("query_string", b"").decode())
+        self.encoding = "binary" if params.get("encoding") == ["binary"] else "json"
+        self.last_seq = {}
+        self.indices = []
+        self.outbound = None
+
+        # ws/straddle/NIFTY50,SENSEX/ subscribes to just those indices, ws/straddle/ to all.
+        requested = self.scope.get("url_route", {}).get("kwargs", {}).get("indices")
+        indices = self.valid_indices(requested.split(",")) if requested is not None else list(INDEX_KEYS)
+        if not indices:
+            # A typo must not fall back to every index, the most expensive subscription there is.
+            logging.warning(f"Rejecting WebSocket for unknown indices: {requested!r}")
+            await self.accept()
+            await self.close(code=4400)
+            return
+
+        self.outbound = OutboundQueue(self.send_item, getattr(settings, "STRADDLE_SEND_QUEUE_DEPTH", 32))
         await self.accept()
+        CONNECTED_CLIENTS.inc()
         logging.info("WebSocket Connection Established.")
-        self.is_active = True
-        asyncio.create_task(self.fetch_and_send_data())
+        self.outbound.start()
+        hub.start(get_channel_layer())
+        if self.encoding == "binary":
+            await self.send(text_data=json.dumps(wire.schema()))
+        await self.add_indices(indices)
+        if self.embedded:
+            poller.subscribe()
 
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection."""
-        self.is_active = False
+        if self.outbound is None:
+            # Rejected in connect(), so nothing was set up.
+            return
+        CONNECTED_CLIENTS.dec()
+        await self.outbound.close()
+        await self.remove_indices(self.indices)
+        if self.embedded:
+            poller.unsubscribe()
         logging.warning(f"WebSocket Disconnected. Close Code: {close_code}")
 
-    async def fetch_and_send_data(self):
-        while self.is_active:
-            try:
-                nifty_data = await asyncio.to_thread(self.get_atm_straddle, "NIFTY50") 
-                sensex_data = await asyncio.to_thread(self.get_atm_straddle, "SENSEX")
-                bankex_data = await asyncio.to_thread(self.get_atm_straddle, "BANKEX")
-                finnifty_data = await asyncio.to_thread(self.get_atm_straddle, "FINNIFTY")
-                midcapnifty_data = await asyncio.to_thread(self.get_atm_straddle, "MIDCPNIFTY")
-                banknifty_data = await asyncio.to_thread(self.get_atm_straddle, "NIFTYBANK")
-                
-                
-
-                # BANKNIFTY
-
-
-
-
-                timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-
-                if nifty_data:
-                    atm_strike, call_price, put_price,ltp = nifty_data
-                    straddle_price = call_price + put_price
-                    await asyncio.to_thread(self.save_to_db, "NIFTY50", atm_strike, call_price, put_price, straddle_price,ltp)
-                    price_history["timestamps"].append(timestamp)
-                    price_history["nifty_straddle"].append(straddle_price)
-                    
-
-                if sensex_data:
-                    atm_strike, call_price, put_price ,ltp= sensex_data
-                    straddle_price = call_price + put_price
-                    await asyncio.to_thread(self.save_to_db, "SENSEX", atm_strike, call_price, put_price, straddle_price,ltp)
-                    price_history["sensex_straddle"].append(straddle_price)
-
-
-                
-                if bankex_data:
-                    atm_strike, call_price, put_price,ltp = bankex_data
-                    straddle_price = call_price + put_price
-                    await asyncio.to_thread(self.save_to_db, "BANKEX", atm_strike, call_price, put_price, straddle_price,ltp)
-                    price_history["bankex_straddle"].append(straddle_price)
-
-
-                
-                if finnifty_data:
-                    atm_strike, call_price, put_price ,ltp= finnifty_data
-                    straddle_price = call_price + put_price
-                    await asyncio.to_thread(self.save_to_db, "FINNIFTY", atm_strike, call_price, put_price, straddle_price,ltp)
-                    price_history["finnifty_straddle"].append(straddle_price)
-
-                
-
-                if midcapnifty_data:
-                    atm_strike, call_price, put_price ,ltp= midcapnifty_data
-                    straddle_price = call_price + put_price
-                    await asyncio.to_thread(self.save_to_db, "MIDCPNIFTY", atm_strike, call_price, put_price, straddle_price,ltp)
-                    price_history["midcapnifty_straddle"].append(straddle_price)
-
-
-                
-                if banknifty_data:
-                    atm_strike, call_price, put_price,ltp = banknifty_data
-                    straddle_price = call_price + put_price
-                    await asyncio.to_thread(self.save_to_db, "NIFTYBANK", atm_strike, call_price, put_price, straddle_price,ltp)
-                    price_history["banknifty_straddle"].append(straddle_price)
-
-
-                if len(price_history["timestamps"]) > 100:
-                    price_history["timestamps"].pop(0)
-                    price_history["nifty_straddle"].pop(0)
-                    price_history["sensex_straddle"].pop(0)
-                    price_history["bankex_straddle"].pop(0)
-                    price_history["finnifty_straddle"].pop(0)
-                    price_history["midcapnifty_straddle"].pop(0)
-                    price_history["banknifty_straddle"].pop(0)
-
-
-
-
-                await self.send(json.dumps({
-                    "timestamp": timestamp,
-                    "nifty": {"atm_strike": nifty_data[0], "call_price": nifty_data[1], "put_price": nifty_data[2], "straddle_price": nifty_data[1] + nifty_data[2], "ltp": nifty_data[3] if nifty_data else None},
-                    "sensex": {"atm_strike": sensex_data[0], "call_price": sensex_data[1], "put_price": sensex_data[2], "straddle_price": sensex_data[1] + sensex_data[2], "ltp": sensex_data[3] if sensex_data else None},
-                    "bankex": {"atm_strike": bankex_data[0], "call_price": bankex_data[1], "put_price": bankex_data[2], "straddle_price": bankex_data[1] + bankex_data[2], "ltp": bankex_data[3] if bankex_data else None},
-                    "finnifty": {"atm_strike": finnifty_data[0], "call_price": finnifty_data[1], "put_price": finnifty_data[2], "straddle_price": finnifty_data[1] + finnifty_data[2], "ltp": finnifty_data[3] if finnifty_data else None},
-                    "midcapnifty": {"atm_strike": midcapnifty_data[0], "call_price": midcapnifty_data[1], "put_price": midcapnifty_data[2], "straddle_price": midcapnifty_data[1] + midcapnifty_data[3], "ltp": midcapnifty_data[3] if midcapnifty_data else None},
-                    "banknifty": {"atm_strike": banknifty_data[0], "call_price": banknifty_data[1], "put_price": banknifty_data[2], "straddle_price": banknifty_data[1] + banknifty_data[2], "ltp": banknifty_data[3] if banknifty_data else None},
-                }))
-
-               
-                await asyncio.sleep(1)
-
-
-            except Exception as e:
-                logging.error(f"WebSocket Error: {e}")
-    
-    def get_atm_straddle(self, index_type):
+    async def receive(self, text_data=None, bytes_data=None):
+        """Handle {"action": "subscribe" | "unsubscribe", "indices": [...]} messages."""
         try:
-            symbol_map = {"NIFTY50": "NSE:NIFTY50-INDEX", "SENSEX": "BSE:SENSEX-INDEX","BANKEX":"BSE:BANKEX-INDEX","FINNIFTY":"NSE:FINNIFTY-INDEX","MIDCPNIFTY":"NSE:MIDCPNIFTY-INDEX","NIFTYBANK": "NSE:NIFTYBANK-INDEX"}
-            symbol = symbol_map.get(index_type)
-            if not symbol:
-                logging.error("Invalid Index Type: %s", index_type)
-                return None
-
-            response = fyers.quotes({"symbols": symbol})
-            if response.get("code") == 429:
-                logging.warning("API Rate Limit Reached. Retrying after 10 seconds...")
-                asyncio.run(asyncio.sleep(10))
-                return self.get_atm_straddle(index_type)
-
-            if not response or "d" not in response or not response["d"]:
-                logging.error("Invalid API Response: %s", response)
-                return None
-
-            ltp = response["d"][0]["v"].get("lp")
-            if ltp is None:
-                logging.error("LTP not found in response")
-                return None
-
-            atm_strike = round(ltp / 50) * 50
-            if index_type == "NIFTY50":
-
-                expiry = self.nifty_get_today_expiry()
-                base_symbol = "NIFTY"
-                exchange = "NSE"
-            elif index_type == "SENSEX":
-
-                expiry = self.sensex_get_today_expiry()
-                base_symbol = "SENSEX"
-                exchange = "BSE"
-            elif index_type == "BANKEX":
-
-                expiry = self.BANKEX_get_today_expiry()
-                base_symbol = "BANKEX"
-                exchange = "BSE"
-            elif index_type == "FINNIFTY":
-
-                expiry = self.FINNIFTY_get_today_expiry()
-                base_symbol = "FINNIFTY"
-                exchange = "NSE"
-            elif index_type == "MIDCPNIFTY":
-
-                expiry = self.midcap_get_last_thursday_expiry()
-                base_symbol = "MIDCPNIFTY"
-                exchange = "NSE"
-            elif index_type == "NIFTYBANK":
-
-                expiry = self.banknifty_get_last_thursday_expiry()
-                base_symbol = "NIFTYBANK"
-                exchange = "NSE"
-            else:
-                logging.error("Invalid Index Type for Expiry Calculation")
-                return None
-
-            if not expiry:
-                return None
-            
-            # base_symbol = "NIFTY" if index_type == "NIFTY50" else "SENSEX"
-            if index_type == "NIFTY50":
-                base_symbol = "NIFTY"
-            elif index_type == "SENSEX":
-                base_symbol = "SENSEX"
-            elif index_type == "BANKEX":
-                base_symbol = "BANKEX"
-            elif index_type == "FINNIFTY":
-                base_symbol = "FINNIFTY"
-            elif index_type == "MIDCPNIFTY":
-                base_symbol = "MIDCPNIFTY"
-            elif index_type == "NIFTYBANK":
-                base_symbol = "NIFTYBANK"
-            
-
-            
-
-            
-            atm_call_symbol = f"{exchange}:{base_symbol}{expiry}{atm_strike}CE"
-            atm_put_symbol = f"{exchange}:{base_symbol}{expiry}{atm_strike}PE"
-            print(atm_call_symbol,atm_put_symbol)
-
-            response = fyers.quotes({"symbols": f"{atm_call_symbol},{atm_put_symbol}"})
-            if response.get("code") == 429:
-                logging.warning("API Rate Limit Reached. Retrying after 10 seconds...")
-                asyncio.run(asyncio.sleep(10))
-                return self.get_atm_straddle(index_type)
-
-            if not response or "d" not in response:
-                logging.error("Invalid Option Chain Response: %s", response)
-                return None
-
-            call_price, put_price = None, None
-            for data in response["d"]:
-                name = data.get("n", "")
-                price = data["v"].get("lp", 0)
-                if "CE" in name:
-                    call_price = price
-                elif "PE" in name:
-                    put_price = price
-
-            if call_price is None or put_price is None:
-                logging.error("Failed to fetch option prices")
-                return None
-
-            return atm_strike, call_price, put_price,ltp
-
-        except Exception as e:
-            logging.error(f"API Error: {e}")
-            return None
-
-    def save_to_db(self, index_name, atm_strike, call_price, put_price, straddle_price,ltp):
-        try:
-            StraddlePrice.objects.create(
-                index_name=index_name,
-                atm_strike=atm_strike,
-                call_price=call_price,
-                put_price=put_price,
-                straddle_price=straddle_price,
-                ltp=ltp
-            )
-            logging.info(f"Data Saved: {index_name} | {atm_strike} | {call_price} | {put_price} | {straddle_price}|{ltp}")
-        except Exception as e:
-            logging.error(f"Database Save Error: {e}")
-
-    def sensex_get_today_expiry(self):
-        """Get the expiry date dynamically for every upcoming Tuesday."""
-        today = datetime.date.today()
-        # Calculate the number of days to the next Tuesday (weekday = 1 for Tuesday)
-        days_until_tuesday = (1 - today.weekday()) % 7
-        next_tuesday = today + datetime.timedelta(days=days_until_tuesday)
-
-        # Format the expiry date as per Fyers' symbol format
-        month_map = {
-            1: "1", 2: "2", 3: "3", 4: "4", 5: "5", 6: "6", 
-            7: "7", 8: "8", 9: "9", 10: "O", 11: "N", 12: "D"
-        }
-        
-        formatted_expiry = f"{next_tuesday.year % 100:02d}{month_map[next_tuesday.month]}{next_tuesday.day:02d}"
-        logging.debug(f"Formatted Expiry: {formatted_expiry}")
-        print(formatted_expiry)
-        return formatted_expiry
-    
-    def nifty_get_today_expiry(self):
-        """Get today's expiry date dynamically for NIFTY options."""
-        today = datetime.date.today()
-        weekday = today.weekday()
-
-        # NIFTY Weekly Expiry on Thursday
-        if weekday < 3:
-            expiry = today + datetime.timedelta(days=(3 - weekday))
-        elif weekday == 3:
-            expiry = today
+            message = json.loads(text_data)
+            indices = self.valid_indices(message.get("indices", []))
+            action = message.get("action")
+        except (TypeError, ValueError, AttributeError):
+            logging.warning(f"Ignoring invalid WebSocket message: {text_data!r}")
+            return
+
+        if action == "subscribe":
+            await self.add_indices(indices)
+        elif action == "unsubscribe":
+            await self.remove_indices(indices)
+
+    @property
+    def embedded(self):
+        """Whether this process polls for its own clients instead of a run_straddle_feed worker."""
+        return getattr(settings, "STRADDLE_EMBEDDED_POLLER", True)
+
+    def valid_indices(self, names):
+        return [name for name in INDEX_KEYS if name in names]
+
+    async def add_indices(self, indices):
+        """Subscribe to newly requested indices, queueing their recent history ahead of live ticks.
+
+        The hub only gets this client's queue once the snapshot is built, and
+        the snapshot goes through the same queue, so no live tick can reach
+        the client before the snapshot that would otherwise wipe it.
+        """
+        new = [index_type for index_type in indices if index_type not in self.indices]
+        if not new:
+            return
+        self.indices += new
+        if self.embedded:
+            poller.watch(new)
+
+        snapshot = await self.snapshot(new)
+        # Indices unsubscribed (or a socket closed) while the snapshot was read stay off the hub.
+        for index_type in new:
+            if index_type in self.indices:
+                hub.add(index_type, self.outbound)
+        self.outbound.put(("snapshot", tuple(new)), json.dumps({"type": "snapshot", "indices": snapshot}))
+
+    async def remove_indices(self, indices):
+        gone = [index_type for index_type in indices if index_type in self.indices]
+        for index_type in gone:
+            hub.remove(index_type, self.outbound)
+            self.last_seq.pop(index_type, None)
+        self.indices = [index_type for index_type in self.indices if index_type not in gone]
+        if self.embedded:
+            poller.unwatch(gone)
+
+    async def snapshot(self, indices):
+        """The last few minutes of the given indices, from memory or the database."""
+        since = time.time() - getattr(settings, "STRADDLE_SNAPSHOT_MINUTES", 10) * 60
+        snapshot = ring_snapshot({index_type: poller.history[index_type] for index_type in indices}, since)
+        missing = [index_type for index_type in indices if index_type not in snapshot]
+        if missing:
+            snapshot.update(await database_sync_to_async(db_snapshot)(missing, since))
+        return snapshot
+
+    async def send_item(self, item):
+        """Send one queued item: a hub Tick, or an already encoded text message."""
+        if isinstance(item, str):
+            await self.send(text_data=item)
         else:
-            expiry = today + datetime.timedelta(days=(7 - weekday + 3))
-
-        # Format the expiry date as per Fyers' symbol format
-        month_map = {
-            1: "1", 2: "2", 3: "3", 4: "4", 5: "5", 6: "6", 
-            7: "7", 8: "8", 9: "9", 10: "O", 11: "N", 12: "D"
-        }
-        
-        formatted_expiry = f"{expiry.year % 100:02d}{month_map[expiry.month]}{expiry.day:02d}"
-        logging.debug(f"Formatted Expiry: {formatted_expiry}")
-        return formatted_expiry
-     
-    def BANKEX_get_today_expiry(self):
-        """Calculate the last Thursday expiry date of the current month."""
-        today = datetime.date.today()
-        next_month = today.month % 12 + 1
-        next_year = today.year + (1 if next_month == 1 else 0)
-        first_day_next_month = datetime.date(next_year, next_month, 1)
-        last_day_this_month = first_day_next_month - datetime.timedelta(days=1)
-        
-        while last_day_this_month.weekday() != 1:  # Thursday is weekday 3
-            last_day_this_month -= datetime.timedelta(days=1)
-        
-        month_map = {
-            1: "JAN", 2: "FEB", 3: "MAR", 4: "APR", 5: "MAY", 6: "JUN", 
-            7: "JUL", 8: "AUG", 9: "SEP", 10: "OCT", 11: "NOV", 12: "DEC"
-        }
-        print(f"{last_day_this_month.year % 100}{month_map[last_day_this_month.month]}")
-        return f"{last_day_this_month.year % 100}{month_map[last_day_this_month.month]}"
+            await self.send_tick(item)
 
-    def FINNIFTY_get_today_expiry(self):
-        """Calculate the last Thursday expiry date of the current month."""
-        today = datetime.date.today()
-        next_month = today.month % 12 + 1
-        next_year = today.year + (1 if next_month == 1 else 0)
-        first_day_next_month = datetime.date(next_year, next_month, 1)
-        last_day_this_month = first_day_next_month - datetime.timedelta(days=1)
-        
-        while last_day_this_month.weekday() != 3:  # Thursday is weekday 3
-            last_day_this_month -= datetime.timedelta(days=1)
-        
-        month_map = {
-            1: "JAN", 2: "FEB", 3: "MAR", 4: "APR", 5: "MAY", 6: "JUN", 
-            7: "JUL", 8: "AUG", 9: "SEP", 10: "OCT", 11: "NOV", 12: "DEC"
-        }
-        print(f"{last_day_this_month.year % 100}{month_map[last_day_this_month.month]}")
-        return f"{last_day_this_month.year % 100}{month_map[last_day_this_month.month]}"
-    
-        
-    def midcap_get_last_thursday_expiry(self):
-        """Calculate the last Thursday expiry date of the current month."""
-        today = datetime.date.today()
-        next_month = today.month % 12 + 1
-        next_year = today.year + (1 if next_month == 1 else 0)
-        first_day_next_month = datetime.date(next_year, next_month, 1)
-        last_day_this_month = first_day_next_month - datetime.timedelta(days=1)
-        
-        while last_day_this_month.weekday() != 3:  # Thursday is weekday 3
-            last_day_this_month -= datetime.timedelta(days=1)
-        
-        month_map = {
-            1: "JAN", 2: "FEB", 3: "MAR", 4: "APR", 5: "MAY", 6: "JUN", 
-            7: "JUL", 8: "AUG", 9: "SEP", 10: "OCT", 11: "NOV", 12: "DEC"
-        }
-        print(f"{last_day_this_month.year % 100}{month_map[last_day_this_month.month]}")
-        return f"{last_day_this_month.year % 100}{month_map[last_day_this_month.month]}"
-    
-    def banknifty_get_last_thursday_expiry(self):
-        """Calculate the last Thursday expiry date of the current month."""
-        today = datetime.date.today()
-        next_month = today.month % 12 + 1
-        next_year = today.year + (1 if next_month == 1 else 0)
-        first_day_next_month = datetime.date(next_year, next_month, 1)
-        last_day_this_month = first_day_next_month - datetime.timedelta(days=1)
-        
-        while last_day_this_month.weekday() != 3:  # Thursday is weekday 3
-            last_day_this_month -= datetime.timedelta(days=1)
-        
-        month_map = {
-            1: "JAN", 2: "FEB", 3: "MAR", 4: "APR", 5: "MAY", 6: "JUN", 
-            7: "JUL", 8: "AUG", 9: "SEP", 10: "OCT", 11: "NOV", 12: "DEC"
-        }
-        print(f"{last_day_this_month.year % 100}{month_map[last_day_this_month.month]}")
-        return f"{last_day_this_month.year % 100}{month_map[last_day_this_month.month]}"
-    
+    async def send_tick(self, tick):
+        """Send one queued hub Tick in this client's encoding."""
+        start = time.perf_counter()
+        if self.encoding == "json":
+            await self.send(text_data=tick.text)
+        else:
+            # A delta only applies on top of the previous frame sent; after a gap
+            # (including ticks coalesced away by the outbound queue) send the full frame.
+            last_seq = self.last_seq.get(tick.index)
+            in_sequence = last_seq is not None and tick.seq == (last_seq + 1) & 0xFFFFFFFF
+            self.last_seq[tick.index] = tick.seq
+            await self.send(bytes_data=tick.delta if in_sequence else tick.full)
+            if tick.surface:
+                await self.send(bytes_data=tick.surface)
+        SEND.observe(time.perf_counter() - start)
+        TICK_AGE.observe(time.time() - tick.ts, tick.index)
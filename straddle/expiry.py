@@ -0,0 +1,147 @@
+import bisect
+import calendar
+import datetime
+import logging
+from django.conf import settings
+from .indices import INSTRUMENTS, MONTHLY, WEEKLY
+
+
+# Month codes used in Fyers weekly (YYMDD) and monthly (YYMON) symbols.
+WEEKLY_MONTH_CODES = {
+    1: "1", 2: "2", 3: "3", 4: "4", 5: "5", 6: "6",
+    7: "7", 8: "8", 9: "9", 10: "O", 11: "N", 12: "D"
+}
+MONTHLY_MONTH_CODES = {
+    1: "JAN", 2: "FEB", 3: "MAR", 4: "APR", 5: "MAY", 6: "JUN",
+    7: "JUL", 8: "AUG", 9: "SEP", 10: "OCT", 11: "NOV", 12: "DEC"
+}
+
+
+def load_holidays(path):
+    """Read exchange holidays from a file with one YYYY-MM-DD date per line."""
+    holidays = set()
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                holidays.add(datetime.date.fromisoformat(line))
+    return holidays
+
+
+class ExpiryCalendar:
+    """Precomputed weekly/monthly expiry codes for every tracked index.
+
+    Expiry dates for a whole year are built once per instrument, with any
+    expiry falling on a holiday moved to the previous trading day. The
+    resolved option-symbol prefix is cached per index and only recomputed
+    after the date rolls over.
+    """
+
+    def __init__(self, instruments=INSTRUMENTS, holidays=()):
+        self.instruments = instruments
+        self.holidays = set(holidays)
+        self._dates = {index_type: [] for index_type in instruments}
+        self._codes = {index_type: [] for index_type in instruments}
+        self._years = set()
+        self._day = None
+        self._prefixes = {}
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays
+
+    def previous_trading_day(self, day):
+        while not self.is_trading_day(day):
+            day -= datetime.timedelta(days=1)
+        return day
+
+    def _scheduled_dates(self, rule, weekday, year):
+        if rule == WEEKLY:
+            day = datetime.date(year, 1, 1)
+            day += datetime.timedelta(days=(weekday - day.weekday()) % 7)
+            while day.year == year:
+                yield day
+                day += datetime.timedelta(days=7)
+        else:
+            for month in range(1, 13):
+                day = datetime.date(year, month, calendar.monthrange(year, month)[1])
+                yield day - datetime.timedelta(days=(day.weekday() - weekday) % 7)
+
+    def build(self, year):
+        """Precompute every expiry date and symbol code for `year`.
+
+        Holiday shifts only move expiries earlier, so an early-January
+        expiry can land in the previous December. Next year's schedule is
+        shifted too, so the monthly code goes to the real last expiry of
+        December, and each year only keeps the dates that fall inside it.
+        """
+        for index_type, instrument in self.instruments.items():
+            rule = instrument.expiry
+            shifted = sorted({
+                self.previous_trading_day(day)
+                for scheduled_year in (year, year + 1)
+                for day in self._scheduled_dates(rule, instrument.expiry_weekday, scheduled_year)
+            })
+            last_in_month = {(day.year, day.month): day for day in shifted}
+
+            for day in shifted:
+                if day.year != year:
+                    continue
+                # The last weekly expiry of a month trades under the monthly code.
+                if rule == MONTHLY or last_in_month[(day.year, day.month)] == day:
+                    code = f"{day.year % 100:02d}{MONTHLY_MONTH_CODES[day.month]}"
+                else:
+                    code = f"{day.year % 100:02d}{WEEKLY_MONTH_CODES[day.month]}{day.day:02d}"
+                i = bisect.bisect_left(self._dates[index_type], day)
+                self._dates[index_type].insert(i, day)
+                self._codes[index_type].insert(i, code)
+
+        self._years.add(year)
+        logging.debug(f"Expiry calendar built for {year}")
+
+    def expiry(self, index_type, day=None):
+        """Return (expiry_date, code) of the nearest expiry on or after `day`."""
+        day = day or datetime.date.today()
+        for year in (day.year, day.year + 1):
+            if year not in self._years:
+                self.build(year)
+
+        dates = self._dates[index_type]
+        i = bisect.bisect_left(dates, day)
+        return dates[i], self._codes[index_type][i]
+
+    def resolve(self, index_type, day=None):
+        """Return (expiry_date, "EXCHANGE:ROOTEXPIRY" option-symbol prefix) as of `day` (today by default).
+
+        Today's answer is cached per index until the date rolls over; other
+        days, as used by replays, are worked out on each call.
+        """
+        today = datetime.date.today()
+        if day is not None and day != today:
+            return self._resolve(index_type, day)
+        if today != self._day:
+            self._day = today
+            self._prefixes = {}
+
+        resolved = self._prefixes.get(index_type)
+        if resolved is None:
+            resolved = self._resolve(index_type, today)
+            if resolved is not None:
+                self._prefixes[index_type] = resolved
+        return resolved
+
+    def _resolve(self, index_type, day):
+        instrument = self.instruments.get(index_type)
+        if instrument is None:
+            logging.error("Invalid Index Type for Expiry Calculation")
+            return None
+        expiry, code = self.expiry(index_type, day)
+        return expiry, instrument.option_prefix + code
+
+    def prefix(self, index_type, day=None):
+        """Return the "EXCHANGE:ROOTEXPIRY" option-symbol prefix of an index as of `day`."""
+        resolved = self.resolve(index_type, day)
+        return resolved[1] if resolved else None
+
+
+holidays_file = getattr(settings, "STRADDLE_HOLIDAYS_FILE", None)
+expiry_calendar = ExpiryCalendar(holidays=load_holidays(holidays_file) if holidays_file else ())
@@ -0,0 +1,140 @@
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import datetime
+from .indices import SPOT_SYMBOLS
+from .expiry import expiry_calendar
+
+
+# Rough index levels the simulated spots start from.
+SPOT_LEVELS = {
+    "NIFTY50": 22000.0,
+    "SENSEX": 73000.0,
+    "BANKEX": 50000.0,
+    "FINNIFTY": 21000.0,
+    "MIDCPNIFTY": 10000.0,
+    "NIFTYBANK": 47000.0,
+}
+
+
+def option_price(spot, strike, years, iv, option_type):
+    """Black-Scholes price of a CE/PE with zero rates, good enough for fake quotes."""
+    if years <= 0 or iv <= 0:
+        return max(spot - strike, 0.0) if option_type == "CE" else max(strike - spot, 0.0)
+    root = iv * math.sqrt(years)
+    d1 = (math.log(spot / strike) + 0.5 * root * root) / root
+    d2 = d1 - root
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    if option_type == "CE":
+        return spot * cdf(d1) - strike * cdf(d2)
+    return strike * cdf(-d2) - spot * cdf(-d1)
+
+
+class MarketSimulator:
+    """Random-walk index spots with option legs priced off them.
+
+    Understands the same spot and option symbols the poller builds, so it
+    can stand in for the exchange behind both the quotes API and the data
+    socket.
+    """
+
+    def __init__(self, volatility=0.0002, iv=0.15, seed=None):
+        self.volatility = volatility
+        self.iv = iv
+        self.rng = random.Random(seed)
+        self.spots = dict(SPOT_LEVELS)
+        self.spot_index = {SPOT_SYMBOLS[index_type]: index_type for index_type in SPOT_LEVELS}
+
+    def step(self):
+        """Move every spot one random-walk step."""
+        for index_type, spot in self.spots.items():
+            self.spots[index_type] = round(spot * math.exp(self.rng.gauss(0, self.volatility)), 2)
+
+    def ltp(self, symbol):
+        """Current price of a spot or option symbol, or None if it is not one we know."""
+        index_type = self.spot_index.get(symbol)
+        if index_type is not None:
+            return self.spots[index_type]
+
+        option_type = symbol[-2:]
+        if option_type not in ("CE", "PE"):
+            return None
+        for index_type, spot in self.spots.items():
+            prefix = expiry_calendar.prefix(index_type)
+            if prefix and symbol.startswith(prefix) and symbol[len(prefix):-2].isdigit():
+                strike = int(symbol[len(prefix):-2])
+                expiry, _ = expiry_calendar.expiry(index_type)
+                years = ((expiry - datetime.date.today()).days + 0.3) / 365
+                return round(max(option_price(spot, strike, years, self.iv, option_type), 0.05), 2)
+        return None
+
+    def message(self, symbol):
+        """A data-socket style update for one symbol ("if" for indices, "sf" for scrips)."""
+        ltp = self.ltp(symbol)
+        if ltp is None:
+            return None
+        kind = "if" if symbol in self.spot_index else "sf"
+        return {"type": kind, "symbol": symbol, "ltp": ltp, "exch_feed_time": int(time.time())}
+
+
+class FeedSimulator:
+    """Local TCP server streaming simulated ticks in the shape of the Fyers data socket.
+
+    Clients send newline-delimited JSON requests such as
+    {"action": "subscribe", "symbols": [...]} and receive one JSON update
+    per line for every subscribed symbol, `rate` times a second. Clients
+    that stop reading miss ticks instead of backing the server up.
+    """
+
+    # Bytes queued for a client beyond which its ticks are skipped.
+    MAX_BUFFER = 1 << 20
+
+    def __init__(self, rate=10, market=None):
+        self.rate = rate
+        self.market = market or MarketSimulator()
+        self.clients = {}
+        self.sent = 0
+        self.skipped = 0
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        logging.info(f"Feed simulator listening on {host}:{port} at {self.rate} ticks/s.")
+        async with server:
+            await self.run()
+
+    async def handle(self, reader, writer):
+        symbols = self.clients[writer] = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    requested = set(request["symbols"])
+                except (ValueError, KeyError, TypeError):
+                    logging.warning(f"Ignoring invalid feed request: {line!r}")
+                    continue
+                if request.get("action") == "subscribe":
+                    symbols |= requested
+                elif request.get("action") == "unsubscribe":
+                    symbols -= requested
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    async def run(self):
+        while True:
+            self.market.step()
+            for writer, symbols in list(self.clients.items()):
+                if writer.transport.get_write_buffer_size() > self.MAX_BUFFER:
+                    self.skipped += 1
+                    continue
+                messages = filter(None, map(self.market.message, symbols))
+                data = "".join(json.dumps(message) + "\n" for message in messages)
+                if data:
+                    writer.write(data.encode())
+                    self.sent += 1
+            await asyncio.sleep(1 / self.rate)
@@ -0,0 +1,260 @@
+import datetime
+import numpy as np
+from .expiry import expiry_calendar
+
+
+# Options stop trading at 15:30 IST on expiry day.
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+EXPIRY_CLOSE = datetime.time(15, 30)
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+# Search interval for implied volatility, as annualised decimals.
+MIN_VOL = 1e-4
+MAX_VOL = 5.0
+
+
+def norm_cdf(x):
+    """Standard normal CDF to double precision (Hart's algorithm, as in West 2005), vectorised."""
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x)
+    exponential = np.exp(-z * z / 2)
+
+    num = 3.52624965998911e-02 * z + 0.700383064443688
+    for c in (6.37396220353165, 33.912866078383, 112.079291497871, 221.213596169931, 220.206867912376):
+        num = num * z + c
+    den = 8.83883476483184e-02 * z + 1.75566716318264
+    for c in (16.064177579207, 86.7807322029461, 296.564248779674, 637.333633378831, 793.826512519948,
+              440.413735824752):
+        den = den * z + c
+    near = exponential * num / den
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = z + 0.65
+        for c in (4, 3, 2, 1):
+            fraction = z + c / fraction
+        far = exponential / fraction / 2.506628274631
+
+    tail = np.where(z < 7.07106781186547, near, far)
+    tail = np.where(z > 37, 0.0, tail)
+    return np.where(x > 0, 1 - tail, tail)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * np.square(x)) / np.sqrt(2 * np.pi)
+
+
+def _d1_d2(spot, strike, years, sigma, rate):
+    root = sigma * np.sqrt(years)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * sigma * sigma) * years) / root
+    return d1, d1 - root
+
+
+def bs_price(spot, strike, years, sigma, is_call, rate=0.0):
+    """Black-Scholes price of European calls (is_call True) or puts, broadcasting over arrays."""
+    d1, d2 = _d1_d2(spot, strike, years, sigma, rate)
+    discount = strike * np.exp(-rate * years)
+    call = spot * norm_cdf(d1) - discount * norm_cdf(d2)
+    return np.where(is_call, call, call - spot + discount)
+
+
+def bs_vega(spot, strike, years, sigma, rate=0.0):
+    d1, _ = _d1_d2(spot, strike, years, sigma, rate)
+    return spot * norm_pdf(d1) * np.sqrt(years)
+
+
+def brent(f, a, b, tol=1e-10, max_iter=100):
+    """Root of scalar f on [a, b] by Brent's method, or NaN if f does not change sign."""
+    fa, fb = f(a), f(b)
+    if fa * fb > 0:
+        return np.nan
+    if abs(fa) < abs(fb):
+        a, b, fa, fb = b, a, fb, fa
+    c, fc, d, bisected = a, fa, a, True
+    for _ in range(max_iter):
+        if fb == 0 or abs(b - a) < tol:
+            return b
+        if fa != fc and fb != fc:
+            s = (a * fb * fc / ((fa - fb) * (fa - fc))
+                 + b * fa * fc / ((fb - fa) * (fb - fc))
+                 + c * fa * fb / ((fc - fa) * (fc - fb)))
+        else:
+            s = b - fb * (b - a) / (fb - fa)
+        if (not (3 * a + b) / 4 < s < b and not b < s < (3 * a + b) / 4) \
+                or (bisected and abs(s - b) >= abs(b - c) / 2) \
+                or (not bisected and abs(s - b) >= abs(c - d) / 2) \
+                or (bisected and abs(b - c) < tol) \
+                or (not bisected and abs(c - d) < tol):
+            s, bisected = (a + b) / 2, True
+        else:
+            bisected = False
+        fs = f(s)
+        c, d, fc = b, c, fb
+        if fa * fs < 0:
+            b, fb = s, fs
+        else:
+            a, fa = s, fs
+        if abs(fa) < abs(fb):
+            a, b, fa, fb = b, a, fb, fa
+    return b
+
+
+def implied_vol(price, spot, strike, years, is_call, rate=0.0, tol=1e-6, max_iter=30):
+    """Implied volatility of every option in the (broadcast) input arrays in one call.
+
+    Newton steps run vectorised over every option still unsolved; the few
+    that stall, overshoot or have too little vega fall back to Brent's
+    method one at a time. Prices outside the no-arbitrage bounds, or with
+    no time left, give NaN.
+    """
+    price, spot, strike, years, is_call = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (price, spot, strike, years, is_call))
+    )
+    shape = price.shape
+    price, spot, strike, years = (a.ravel() for a in (price, spot, strike, years))
+    is_call = is_call.ravel().astype(bool)
+
+    discount = strike * np.exp(-rate * years)
+    lower = np.where(is_call, np.maximum(spot - discount, 0), np.maximum(discount - spot, 0))
+    upper = np.where(is_call, spot, discount)
+    with np.errstate(invalid="ignore"):
+        valid = (years > 0) & (price > lower) & (price < upper) & (spot > 0) & (strike > 0)
+
+    sigma = np.full(price.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Brenner-Subrahmanyam starting point, exact for an at-the-money option.
+        guess = np.sqrt(2 * np.pi / years) * price / spot
+    sigma[valid] = np.clip(guess[valid], 0.01, 2.0)
+
+    pending = np.flatnonzero(valid)
+    fallback = []
+    for _ in range(max_iter):
+        if not len(pending):
+            break
+        s, k, t, c = spot[pending], strike[pending], years[pending], is_call[pending]
+        vol = sigma[pending]
+        diff = bs_price(s, k, t, vol, c, rate) - price[pending]
+        vega = bs_vega(s, k, t, vol, rate)
+
+        solved = np.abs(diff) < tol
+        stuck = ~solved & (vega < 1e-8)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = vol - diff / vega
+        bad = ~solved & ~stuck & ~((step > MIN_VOL) & (step < MAX_VOL))
+        moving = ~solved & ~stuck & ~bad
+
+        sigma[pending[moving]] = step[moving]
+        fallback.extend(pending[stuck | bad])
+        pending = pending[moving]
+    fallback.extend(pending)
+
+    for i in fallback:
+        def error(vol, i=i):
+            return float(bs_price(spot[i], strike[i], years[i], vol, is_call[i], rate)) - price[i]
+
+        sigma[i] = brent(error, MIN_VOL, MAX_VOL, tol=tol * 1e-3)
+
+    return sigma.reshape(shape)
+
+
+def greeks(spot, strike, years, sigma, is_call, rate=0.0):
+    """Delta, gamma, vega (per vol point) and theta (per calendar day) as arrays."""
+    d1, d2 = _d1_d2(spot, strike, years, sigma, rate)
+    pdf = norm_pdf(d1)
+    root_t = np.sqrt(years)
+    carry = rate * strike * np.exp(-rate * years)
+    decay = -spot * pdf * sigma / (2 * root_t)
+    return {
+        "delta": np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1),
+        "gamma": pdf / (spot * sigma * root_t),
+        "vega": spot * pdf * root_t / 100,
+        "theta": np.where(is_call, decay - carry * norm_cdf(d2), decay + carry * norm_cdf(-d2)) / 365,
+    }
+
+
+def expiry_close(index_type, day):
+    """Epoch seconds of the close of the first expiry of an index on or after `day`."""
+    expiry, _ = expiry_calendar.expiry(index_type, day)
+    return datetime.datetime.combine(expiry, EXPIRY_CLOSE, IST).timestamp()
+
+
+def years_to_expiry(index_names, epochs, expiries=None):
+    """Years from each epoch timestamp to its index's expiry close, for arrays of rows.
+
+    `expiries`, one date per row, names the contracts actually quoted (as
+    resolved by option_legs). Without it the expiry calendar is consulted
+    once per distinct (index, IST day) pair rather than once per row.
+    """
+    epochs = np.asarray(epochs, dtype=float)
+    if expiries is not None:
+        closes = np.array([datetime.datetime.combine(expiry, EXPIRY_CLOSE, IST).timestamp() for expiry in expiries])
+        return np.maximum(closes.reshape(epochs.shape) - epochs, 0) / SECONDS_PER_YEAR
+
+    names, name_codes = np.unique(np.asarray(index_names), return_inverse=True)
+    offset = IST.utcoffset(None).total_seconds()
+    days = np.floor((epochs.ravel() + offset) / 86400).astype(np.int64)
+    pairs, inverse = np.unique(np.stack([name_codes.ravel(), days], axis=1), axis=0, return_inverse=True)
+
+    epoch_day = datetime.date(1970, 1, 1)
+    closes = np.array([expiry_close(names[n], epoch_day + datetime.timedelta(days=int(d))) for n, d in pairs])
+    closes = closes[inverse.ravel()].reshape(epochs.shape)
+    return np.maximum(closes - epochs, 0) / SECONDS_PER_YEAR
+
+
+def straddle_analytics(index_names, epochs, ltp, strike, call_price, put_price, rate=0.0, expiries=None):
+    """IVs and straddle Greeks for arrays of ATM straddle rows, all solved in one batch.
+
+    Returns a dict of arrays: call_iv, put_iv, atm_iv (their mean, or the
+    one that solved) and the straddle's delta, gamma, vega and theta.
+    """
+    ltp, strike, call_price, put_price = (np.asarray(a, dtype=float) for a in (ltp, strike, call_price, put_price))
+    years = years_to_expiry(index_names, epochs, expiries)
+
+    # Solve both legs together: calls in the first half, puts in the second.
+    ivs = implied_vol(
+        np.concatenate([call_price, put_price]),
+        np.concatenate([ltp, ltp]),
+        np.concatenate([strike, strike]),
+        np.concatenate([years, years]),
+        np.concatenate([np.ones(len(ltp), bool), np.zeros(len(ltp), bool)]),
+        rate,
+    )
+    call_iv, put_iv = ivs[:len(ltp)], ivs[len(ltp):]
+    with np.errstate(invalid="ignore"):
+        atm_iv = np.where(np.isnan(call_iv), put_iv, np.where(np.isnan(put_iv), call_iv, (call_iv + put_iv) / 2))
+        call = greeks(ltp, strike, years, call_iv, True, rate)
+        put = greeks(ltp, strike, years, put_iv, False, rate)
+
+    result = {"years": years, "call_iv": call_iv, "put_iv": put_iv, "atm_iv": atm_iv}
+    for name in ("delta", "gamma", "vega", "theta"):
+        result[name] = call[name] + put[name]
+    return result
+
+
+def day_analytics(day=None, index_names=None):
+    """Analytics for every stored StraddlePrice row of a day (IST), all indices in one call.
+
+    Time to expiry runs to the expiry option_legs() quotes on that day, so
+    a row gets the same ATM IV here as it did live.
+    """
+    from .models import StraddlePrice
+    from .symbolmaster import option_expiry
+
+    day = day or datetime.datetime.now(IST).date()
+    start = datetime.datetime.combine(day, datetime.time.min, IST)
+    rows = StraddlePrice.objects.filter(timestamp__gte=start, timestamp__lt=start + datetime.timedelta(days=1))
+    if index_names:
+        rows = rows.filter(index_name__in=index_names)
+    rows = list(rows.order_by("timestamp").values_list("index_name", "timestamp", "ltp", "atm_strike",
+                                                        "call_price", "put_price"))
+    if not rows:
+        return {"index_name": [], "timestamps": []}
+
+    names, timestamps, ltp, strike, call_price, put_price = zip(*rows)
+    epochs = np.array([t.timestamp() for t in timestamps])
+    expiry_by_index = {name: option_expiry(name, day) for name in set(names)}
+    expiries = [expiry_by_index[name] for name in names]
+    result = straddle_analytics(names, epochs, ltp, strike, call_price, put_price,
+                                expiries=expiries if None not in expiries else None)
+    result["index_name"] = np.array(names)
+    result["timestamps"] = epochs
+    return result
@@ -0,0 +1,81 @@
+import datetime
+from django.db.models import Q
+from .models import StraddlePrice
+
+# Columns returned by the history queries, in order.
+HISTORY_FIELDS = ("timestamp", "atm_strike", "call_price", "put_price", "straddle_price", "ltp")
+HISTORY_KEYS = ("timestamps", "strike", "call", "put", "straddle", "ltp")
+
+
+def columnar(rows):
+    """Turn values_list rows of HISTORY_FIELDS into a dict of column arrays."""
+    columns = list(zip(*rows)) or [()] * len(HISTORY_FIELDS)
+    data = dict(zip(HISTORY_KEYS, map(list, columns)))
+    data["timestamps"] = [ts.timestamp() for ts in data["timestamps"]]
+    return data
+
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def make_cursor(ts, pk):
+    """Encode a (timestamp, id) keyset position as "<epoch microseconds>_<id>"."""
+    return f"{(ts - EPOCH) // MICROSECOND}_{pk}"
+
+
+def parse_cursor(value):
+    """Parse a cursor produced by make_cursor."""
+    try:
+        micros, pk = value.split("_")
+        ts, pk = EPOCH + int(micros) * MICROSECOND, int(pk)
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid cursor: {value}")
+    # Ids outside SQLite's 64-bit INTEGER range would overflow in the query.
+    if not 0 <= pk < 2 ** 63:
+        raise ValueError(f"Invalid cursor: {value}")
+    return ts, pk
+
+
+def latest_window(index_name, limit, before=None):
+    """Newest `limit` ticks of an index older than the `before` cursor, oldest first.
+
+    Keyset pagination on (timestamp, id) walks the (index_name, timestamp)
+    index, so every page costs the same no matter how large the table is.
+    Returns the rows and the cursor for the next (older) page.
+    """
+    rows = StraddlePrice.objects.filter(index_name=index_name)
+    if before is not None:
+        ts, pk = before
+        rows = rows.filter(Q(timestamp__lt=ts) | Q(timestamp=ts, id__lt=pk))
+
+    rows = list(rows.order_by("-timestamp", "-id").values_list("id", *HISTORY_FIELDS)[:limit])
+    cursor = make_cursor(rows[-1][1], rows[-1][0]) if len(rows) == limit else None
+    rows.reverse()
+    return [row[1:] for row in rows], cursor
+
+
+def recent(index_name, since):
+    """Ticks of an index at or after the aware datetime `since`, oldest first."""
+    rows = StraddlePrice.objects.filter(index_name=index_name, timestamp__gte=since)
+    return rows.order_by("timestamp").values_list(*HISTORY_FIELDS)
+
+
+def ring_columnar(rows):
+    """Turn TickRing rows into the same column arrays as columnar()."""
+    return dict(zip(HISTORY_KEYS, rows.T.tolist()))
+
+
+def ring_snapshot(rings, since):
+    """Column arrays of every buffered tick since the epoch time `since`, per index.
+
+    Indices whose ring is empty are left out so the caller can fall back to
+    db_snapshot() for them.
+    """
+    return {index_name: ring_columnar(ring.since(since)) for index_name, ring in rings.items() if len(ring)}
+
+
+def db_snapshot(index_names, since):
+    """Same as ring_snapshot() but read from the (index_name, timestamp) index."""
+    start = datetime.datetime.fromtimestamp(since, tz=datetime.timezone.utc)
+    return {index_name: columnar(recent(index_name, start)) for index_name in index_names}
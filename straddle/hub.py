@@ -0,0 +1,148 @@
+import json
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from .indices import INDEX_KEYS
+from .metrics import Counter
+from . import wire
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    def dumps(obj):
+        return orjson.dumps(obj).decode()
+else:
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+# Prefix of the per-index channel-layer groups ticks are published to, e.g. "straddle.NIFTY50".
+STRADDLE_GROUP = "straddle"
+
+
+def group_for(index_type):
+    return f"{STRADDLE_GROUP}.{index_type}"
+
+
+@dataclass(frozen=True)
+class Tick:
+    """One index's tick, encoded once into every wire format."""
+    index: str
+    seq: int
+    ts: float
+    text: str
+    full: bytes
+    delta: bytes
+    surface: bytes = b""
+
+    def message(self):
+        """Channel-layer message carrying this tick."""
+        return {
+            "type": "straddle.tick",
+            "index": self.index,
+            "seq": self.seq,
+            "ts": self.ts,
+            "text": self.text,
+            "full": self.full,
+            "delta": self.delta,
+            "surface": self.surface,
+        }
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(
+            message["index"], message["seq"], message["ts"], message["text"], message["full"], message["delta"],
+            message.get("surface", b""),
+        )
+
+
+def encode_tick(encoder, index_type, payload):
+    """Encode an index's entry of a poller payload as JSON text and binary frames."""
+    key = INDEX_KEYS[index_type]
+    data = payload.get(key)
+    seq, full, delta = encoder.encode(index_type, data, payload["ts"])
+    text = dumps({"timestamp": payload["timestamp"], "ts": payload["ts"], key: data})
+    surface = b""
+    if data and data.get("surface"):
+        position = encoder.positions[index_type]
+        surface = wire.encode_surface(position, seq, payload["ts"], data["atm_strike"], data["surface"])
+    return Tick(index_type, seq, payload["ts"], text, full, delta, surface)
+
+
+class BroadcastHub:
+    """Per-process fan-out of encoded ticks to local WebSocket consumers.
+
+    A single relay channel joins the per-index channel-layer groups, so each
+    tick crosses the channel layer once per process rather than once per
+    consumer. The relay hands the same immutable Tick to the outbound queue
+    of every local consumer subscribed to that index.
+    """
+
+    # Re-join groups well before the channel layer's group_expiry drops them.
+    REJOIN_INTERVAL = 3600
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self._task = None
+
+    def add(self, index_type, queue):
+        self.subscribers[index_type].add(queue)
+
+    def remove(self, index_type, queue):
+        self.subscribers[index_type].discard(queue)
+
+    @property
+    def clients(self):
+        return len(set().union(*self.subscribers.values()))
+
+    def publish(self, tick):
+        queues = self.subscribers.get(tick.index, ())
+        for queue in queues:
+            queue.put(tick.index, tick)
+        self.published += 1
+        self.delivered += len(queues)
+
+    def start(self, channel_layer):
+        """Start the relay task if it is not already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.relay(channel_layer))
+
+    async def join(self, channel_layer, channel):
+        for index_type in INDEX_KEYS:
+            await channel_layer.group_add(group_for(index_type), channel)
+
+    async def relay(self, channel_layer):
+        channel = await channel_layer.new_channel("straddle.hub")
+        await self.join(channel_layer, channel)
+        joined = time.monotonic()
+        while True:
+            try:
+                message = await asyncio.wait_for(channel_layer.receive(channel), 60)
+                if message.get("type") == "straddle.tick":
+                    self.publish(Tick.from_message(message))
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Hub Relay Error: {e}")
+                await asyncio.sleep(1)
+
+            if time.monotonic() - joined > self.REJOIN_INTERVAL:
+                await self.join(channel_layer, channel)
+                joined = time.monotonic()
+
+    def stats(self):
+        return {"clients": self.clients, "published": self.published, "delivered": self.delivered}
+
+
+hub = BroadcastHub()
+
+Counter("straddle_hub_published_total", "Ticks relayed by this process's hub.", func=lambda: hub.published)
+Counter("straddle_hub_delivered_total", "Ticks handed to client queues by the hub.", func=lambda: hub.delivered)
@@ -0,0 +1,103 @@
+import json
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+
+WEEKDAYS = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4}
+
+# Every tracked index, in dashboard order. STRADDLE_INSTRUMENTS_FILE may
+# replace this with a JSON list of the same records. The option root is
+# the underlying as the exchange names its options, which is not always
+# the spot index name (Bank Nifty options trade as BANKNIFTY).
+DEFAULT_INSTRUMENTS = [
+    {"name": "NIFTY50", "key": "nifty", "exchange": "NSE", "spot_symbol": "NSE:NIFTY50-INDEX",
+     "option_root": "NIFTY", "strike_step": 50, "expiry": WEEKLY, "expiry_weekday": "thursday", "lot_size": 75},
+    {"name": "SENSEX", "key": "sensex", "exchange": "BSE", "spot_symbol": "BSE:SENSEX-INDEX",
+     "option_root": "SENSEX", "strike_step": 100, "expiry": WEEKLY, "expiry_weekday": "tuesday", "lot_size": 20},
+    {"name": "BANKEX", "key": "bankex", "exchange": "BSE", "spot_symbol": "BSE:BANKEX-INDEX",
+     "option_root": "BANKEX", "strike_step": 100, "expiry": MONTHLY, "expiry_weekday": "tuesday", "lot_size": 30},
+    {"name": "FINNIFTY", "key": "finnifty", "exchange": "NSE", "spot_symbol": "NSE:FINNIFTY-INDEX",
+     "option_root": "FINNIFTY", "strike_step": 50, "expiry": MONTHLY, "expiry_weekday": "thursday", "lot_size": 65},
+    {"name": "MIDCPNIFTY", "key": "midcapnifty", "exchange": "NSE", "spot_symbol": "NSE:MIDCPNIFTY-INDEX",
+     "option_root": "MIDCPNIFTY", "strike_step": 25, "expiry": MONTHLY, "expiry_weekday": "thursday",
+     "lot_size": 120},
+    {"name": "NIFTYBANK", "key": "banknifty", "exchange": "NSE", "spot_symbol": "NSE:NIFTYBANK-INDEX",
+     "option_root": "BANKNIFTY", "strike_step": 100, "expiry": MONTHLY, "expiry_weekday": "thursday",
+     "lot_size": 35},
+]
+
+
+@dataclass(frozen=True)
+class Instrument:
+    """One tradable index: where its spot is quoted and how its options are named.
+
+    Everything a tick needs is resolved here once, so the hot path only
+    does arithmetic and string concatenation.
+    """
+
+    name: str
+    key: str
+    exchange: str
+    spot_symbol: str
+    option_root: str
+    strike_step: int
+    expiry: str
+    expiry_weekday: int
+    lot_size: int
+
+    @property
+    def option_prefix(self):
+        """"EXCHANGE:ROOT", to which the expiry code, strike and CE/PE are appended."""
+        return f"{self.exchange}:{self.option_root}"
+
+    def atm_strike(self, ltp):
+        return round(ltp / self.strike_step) * self.strike_step
+
+
+def build_instruments(records):
+    """Validate instrument records into a name -> Instrument dict, keeping their order."""
+    instruments = {}
+    for record in records:
+        try:
+            weekday = record["expiry_weekday"]
+            instrument = Instrument(
+                name=record["name"],
+                key=record["key"],
+                exchange=record["exchange"],
+                spot_symbol=record["spot_symbol"],
+                option_root=record["option_root"],
+                strike_step=int(record["strike_step"]),
+                expiry=record["expiry"],
+                expiry_weekday=WEEKDAYS[weekday.lower()] if isinstance(weekday, str) else int(weekday),
+                lot_size=int(record["lot_size"]),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ImproperlyConfigured(f"Invalid instrument {record!r}: {e}")
+        if instrument.expiry not in (WEEKLY, MONTHLY):
+            raise ImproperlyConfigured(f"Unknown expiry rule for {instrument.name}: {instrument.expiry}")
+        if instrument.strike_step <= 0:
+            raise ImproperlyConfigured(f"Strike step for {instrument.name} must be positive")
+        if instrument.name in instruments:
+            raise ImproperlyConfigured(f"Duplicate instrument: {instrument.name}")
+        instruments[instrument.name] = instrument
+    return instruments
+
+
+def load_instruments(path=None):
+    if not path:
+        return build_instruments(DEFAULT_INSTRUMENTS)
+    with open(path) as f:
+        return build_instruments(json.load(f))
+
+
+INSTRUMENTS = load_instruments(getattr(settings, "STRADDLE_INSTRUMENTS_FILE", None))
+
+# Index type -> key used in the payload sent to the dashboard.
+INDEX_KEYS = {name: instrument.key for name, instrument in INSTRUMENTS.items()}
+
+# Index type -> spot symbol quoted to find the ATM strike.
+SPOT_SYMBOLS = {name: instrument.spot_symbol for name, instrument in INSTRUMENTS.items()}
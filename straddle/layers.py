@@ -0,0 +1,178 @@
+import time
+import random
+import string
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import msgpack
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_channel_id ON messages (channel, id);
+CREATE TABLE IF NOT EXISTS groups (
+    grp TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (grp, channel)
+);
+"""
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """Channel layer stored in a local SQLite file shared by every process on the host.
+
+    Lets several Daphne/uvicorn workers and the run_straddle_feed worker
+    exchange ticks without running Redis. Receivers poll the file, backing
+    off from `poll_interval` to `max_poll_interval` while idle. All SQLite
+    work runs on one background thread per process so the event loop never
+    blocks on the file.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        path="channels.sqlite3",
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.005,
+        max_poll_interval=0.1,
+        **kwargs,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._db = None
+        self._sends = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="channels-sqlite")
+
+    # SQLite helpers, always run on the layer's own thread
+
+    def _connect(self):
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _insert(self, db, channel, body, now):
+        (queued,) = db.execute(
+            "SELECT COUNT(*) FROM messages WHERE channel = ? AND expires >= ?", (channel, now)
+        ).fetchone()
+        if queued >= self.get_capacity(channel):
+            raise ChannelFull(channel)
+        db.execute(
+            "INSERT INTO messages (channel, expires, body) VALUES (?, ?, ?)", (channel, now + self.expiry, body)
+        )
+
+    def _send(self, channel, body):
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert(db, channel, body, now)
+        finally:
+            db.execute("COMMIT")
+        self._cleanup(db, now)
+
+    def _group_send(self, group, body):
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            channels = db.execute("SELECT channel FROM groups WHERE grp = ? AND expires >= ?", (group, now)).fetchall()
+            for (channel,) in channels:
+                try:
+                    self._insert(db, channel, body, now)
+                except ChannelFull:
+                    pass
+        finally:
+            db.execute("COMMIT")
+        self._cleanup(db, now)
+
+    def _receive_one(self, channel):
+        db = self._connect()
+        while True:
+            row = db.execute(
+                "SELECT id, body FROM messages WHERE channel = ? AND expires >= ? ORDER BY id LIMIT 1",
+                (channel, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            # Another process may have claimed the same row; only the one that deletes it wins.
+            if db.execute("DELETE FROM messages WHERE id = ?", (row[0],)).rowcount == 1:
+                return row[1]
+
+    def _cleanup(self, db, now):
+        self._sends += 1
+        if self._sends % 1000 == 0:
+            db.execute("DELETE FROM messages WHERE expires < ?", (now,))
+            db.execute("DELETE FROM groups WHERE expires < ?", (now,))
+
+    def _execute(self, sql, params=()):
+        self._connect().execute(sql, params)
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        await self._run(self._send, channel, msgpack.packb(message, use_bin_type=True))
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        delay = self.poll_interval
+        while True:
+            body = await self._run(self._receive_one, channel)
+            if body is not None:
+                return msgpack.unpackb(body, raw=False)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_poll_interval)
+
+    async def new_channel(self, prefix="specific"):
+        return "%s.sqlite!%s" % (prefix, "".join(random.choice(string.ascii_letters) for _ in range(12)))
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._run(
+            self._execute,
+            "INSERT OR REPLACE INTO groups (grp, channel, expires) VALUES (?, ?, ?)",
+            (group, channel, time.time() + self.group_expiry),
+        )
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._run(self._execute, "DELETE FROM groups WHERE grp = ? AND channel = ?", (group, channel))
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        await self._run(self._group_send, group, msgpack.packb(message, use_bin_type=True))
+
+    async def flush(self):
+        await self._run(self._execute, "DELETE FROM messages")
+        await self._run(self._execute, "DELETE FROM groups")
+
+    async def close(self):
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
@@ -0,0 +1,143 @@
+import os
+import time
+import socket
+import asyncio
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class LeaderLock:
+    """Non-blocking exclusive lock on a file; whichever process holds it is the leader.
+
+    The OS releases the lock when the holder exits or crashes, so another
+    worker takes over on its next acquire() attempt.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self):
+        """Try to become leader, returning True if this process holds the lock."""
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            logging.warning("File locking is unavailable on this platform; assuming leadership.")
+            self._fd = -1
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        logging.info(f"Acquired straddle leader lock {self.path} (pid {os.getpid()}).")
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+        self._fd = None
+
+
+# Channel-layer group every worker publishes its watched indices to.
+WATCH_GROUP = "straddle.watchers"
+
+
+class SharedWatchers:
+    """Indices watched by the clients of every worker process, shared over the channel layer.
+
+    Each worker publishes its own watched set as a heartbeat whenever it
+    changes and at least every `ttl / 3` seconds, and listens for the sets
+    of the others. A set not refreshed within `ttl` seconds is forgotten,
+    so a worker that exits without saying goodbye stops counting soon after.
+    Expiry runs on the receiver's clock, so hosts need not agree on the time.
+    """
+
+    # Re-join the group well before the channel layer's group_expiry drops it.
+    REJOIN_INTERVAL = 3600
+
+    def __init__(self, ttl=15):
+        self.ttl = ttl
+        self.worker = f"{socket.gethostname()}.{os.getpid()}"
+        self.sets = {}
+        self._sent = None
+        self._sent_at = 0
+        self._task = None
+
+    def union(self):
+        """Every index some live worker's clients watch."""
+        now = time.monotonic()
+        self.sets = {worker: entry for worker, entry in self.sets.items() if entry[1] > now}
+        return set().union(*(indices for indices, _ in self.sets.values()))
+
+    def receive(self, message):
+        self.sets[message["worker"]] = (set(message["indices"]), time.monotonic() + self.ttl)
+
+    async def heartbeat(self, channel_layer, indices):
+        """Publish this worker's watched indices if they changed or are due a refresh."""
+        indices = sorted(indices)
+        if indices == self._sent and time.monotonic() - self._sent_at < self.ttl / 3:
+            return
+        await channel_layer.group_send(
+            WATCH_GROUP, {"type": "straddle.watch", "worker": self.worker, "indices": indices}
+        )
+        self._sent, self._sent_at = indices, time.monotonic()
+
+    def start(self, channel_layer):
+        """Start listening for the other workers' heartbeats if not already."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.listen(channel_layer))
+
+    async def stop(self, channel_layer):
+        """Stop listening and tell the others this worker watches nothing any more."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await channel_layer.group_send(
+                WATCH_GROUP, {"type": "straddle.watch", "worker": self.worker, "indices": []}
+            )
+        except Exception as e:
+            logging.warning(f"Could not withdraw watched indices: {e}")
+        self._sent = None
+
+    async def listen(self, channel_layer):
+        channel = await channel_layer.new_channel("straddle.watch")
+        await channel_layer.group_add(WATCH_GROUP, channel)
+        joined = time.monotonic()
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(channel_layer.receive(channel), 60)
+                    if message.get("type") == "straddle.watch":
+                        self.receive(message)
+                except asyncio.TimeoutError:
+                    pass
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(f"Watcher Heartbeat Error: {e}")
+                    await asyncio.sleep(1)
+
+                if time.monotonic() - joined > self.REJOIN_INTERVAL:
+                    await channel_layer.group_add(WATCH_GROUP, channel)
+                    joined = time.monotonic()
+        finally:
+            await channel_layer.group_discard(WATCH_GROUP, channel)
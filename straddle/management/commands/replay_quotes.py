@@ -0,0 +1,50 @@
+import os
+import json
+import asyncio
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay quote responses recorded with STRADDLE_RECORD_QUOTES through the poller. "
+        "Ticks are persisted to a throwaway test database and published nowhere, unless "
+        "--live sends them to the real database and channel layer as the live feed would."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Recorded .jsonl.gz quotes log.")
+        parser.add_argument("--speed", default="1",
+                            help='Multiple of real time, e.g. 1 or 10, or "max" to replay as fast as possible.')
+        parser.add_argument("--live", action="store_true",
+                            help="Write ticks to the real StraddlePrice table and publish them to connected "
+                                 "dashboards. Replaying a stored day this way duplicates its rows.")
+
+    def handle(self, *args, **options):
+        from straddle.recording import ReplayDriver
+
+        try:
+            speed = None if options["speed"] == "max" else float(options["speed"])
+        except ValueError:
+            raise CommandError(f"Invalid --speed {options['speed']!r}.")
+        if not os.path.isfile(options["path"]):
+            raise CommandError(f"No recorded quotes log at {options['path']}.")
+
+        if options["live"]:
+            driver = ReplayDriver(options["path"], speed=speed)
+            self.replay(driver)
+        else:
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                driver = ReplayDriver(options["path"], speed=speed, channel_layer=InMemoryChannelLayer())
+                self.replay(driver)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        self.stdout.write(json.dumps(driver.stats()))
+
+    def replay(self, driver):
+        try:
+            asyncio.run(driver.run())
+        except KeyboardInterrupt:
+            pass
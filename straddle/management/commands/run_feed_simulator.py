@@ -0,0 +1,25 @@
+import asyncio
+from django.core.management.base import BaseCommand
+from straddle.feedsim import FeedSimulator, MarketSimulator
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve simulated spot and option ticks shaped like the Fyers data socket, "
+        "for `run_straddle_feed --engine stream` to consume offline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--rate", type=float, default=10.0, help="Ticks per second for every subscribed symbol.")
+        parser.add_argument("--volatility", type=float, default=0.0002, help="Per-tick standard deviation of spot log returns.")
+        parser.add_argument("--seed", type=int, help="Random seed, for repeatable sessions.")
+
+    def handle(self, *args, **options):
+        market = MarketSimulator(volatility=options["volatility"], seed=options["seed"])
+        simulator = FeedSimulator(rate=options["rate"], market=market)
+        try:
+            asyncio.run(simulator.serve(options["host"], options["port"]))
+        except KeyboardInterrupt:
+            self.stdout.write("Feed simulator stopped.")
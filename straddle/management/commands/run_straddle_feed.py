@@ -0,0 +1,55 @@
+import os
+import signal
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from straddle.indices import INDEX_KEYS
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the straddle ingest worker: poll Fyers, persist ticks and publish them "
+        "to the channel layer for the WebSocket consumers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--indices", nargs="+", choices=list(INDEX_KEYS), default=list(INDEX_KEYS),
+                            help="Indices to ingest (default: all).")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds between ticks.")
+        parser.add_argument("--cpu", type=int, nargs="+", help="Pin the worker to these CPU cores.")
+        parser.add_argument("--engine", choices=["poll", "stream"], default="poll",
+                            help="Poll the quotes API every interval, or build ticks from a streaming feed.")
+        parser.add_argument("--feed", default=getattr(settings, "STRADDLE_STREAM_FEED", "fyers"),
+                            help='Streaming feed: "fyers" or the host:port of run_feed_simulator.')
+
+    def handle(self, *args, **options):
+        from straddle.poller import poller
+
+        if options["cpu"]:
+            if not hasattr(os, "sched_setaffinity"):
+                raise CommandError("CPU pinning is not supported on this platform.")
+            os.sched_setaffinity(0, options["cpu"])
+
+        # The stream engine also emits at most one tick per index per interval.
+        poller.interval = options["interval"]
+        if options["engine"] == "stream":
+            from straddle.stream import StraddleStream, open_feed
+
+            engine = StraddleStream(poller, open_feed(options["feed"]), options["indices"])
+        else:
+            poller.watch(options["indices"])
+            engine = poller
+        self.stdout.write(f"Straddle feed started for {', '.join(options['indices'])} ({options['engine']}).")
+        asyncio.run(self.run(engine))
+        self.stdout.write("Straddle feed stopped.")
+
+    async def run(self, engine):
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, task.cancel)
+
+        try:
+            await engine.run()
+        except asyncio.CancelledError:
+            pass
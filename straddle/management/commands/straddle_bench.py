@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from straddle.bench import bench_db_inserts, bench_fanout, bench_pipeline, bench_websocket, dump, environment
+
+
+SUITES = ["pipeline", "db", "fanout", "websocket"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the straddle pipeline against a synthetic quote provider and print "
+        "machine-readable JSON results. Suites that touch the database run against a "
+        "throwaway test database, never the real one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--suite", nargs="+", choices=SUITES, default=SUITES)
+        parser.add_argument("--ticks", type=int, default=100)
+        parser.add_argument("--latency", type=float, default=0.0,
+                            help="Synthetic quotes round-trip time in milliseconds for the pipeline suite.")
+        parser.add_argument("--rows", type=int, default=6000, help="Rows inserted per batch size by the db suite.")
+        parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100, 1000],
+                            help="Client counts for the in-process fanout suite.")
+        parser.add_argument("--ws-clients", type=int, nargs="+", default=[1, 100, 1000],
+                            help="WebsocketCommunicator client counts for the websocket suite.")
+        parser.add_argument("--encoding", choices=["binary", "json"], default="binary")
+        parser.add_argument("--output", help="Also write the JSON results to this file.")
+
+    def handle(self, *args, **options):
+        suites = options["suite"]
+        results = {"environment": environment()}
+        if "fanout" in suites:
+            results["fanout"] = bench_fanout(options["clients"], options["ticks"])
+
+        if any(suite in suites for suite in ("pipeline", "db", "websocket")):
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                if "pipeline" in suites:
+                    results["pipeline"] = bench_pipeline(options["ticks"], options["latency"] / 1000)
+                if "db" in suites:
+                    results["db"] = bench_db_inserts(options["rows"])
+                if "websocket" in suites:
+                    results["websocket"] = bench_websocket(
+                        options["ws_clients"], max(options["ticks"] // 5, 1), options["encoding"]
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(dump(results, options["output"]))
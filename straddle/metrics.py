@@ -0,0 +1,118 @@
+import bisect
+import threading
+
+
+# Upper bounds in seconds, from sub-millisecond encoding up to the fetch timeout.
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REGISTRY = []
+
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    """Count that only goes up, kept here or read from `func` at scrape time.
+
+    `func` lets counters an object already keeps (like TickWriter.flushed)
+    be exported without touching the code that increments them.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), func=None):
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        if self.func is not None:
+            return self.header() + [f"{self.name} {self.func()}"]
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down, or is read from `func` at scrape time."""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Bucketed distribution of observed values, one series per label tuple.
+
+    An observation is one bisect and two additions, cheap enough for every
+    tick and every frame sent.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def collect(self):
+        lines = self.header()
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = format_labels(self.labelnames, labels, [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            suffix = format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
+
+
+QUOTE_RTT = Histogram("straddle_quote_rtt_seconds", "Round-trip time of one quotes call.", ["kind"])
+DB_WRITE = Histogram("straddle_db_write_seconds", "Time to bulk insert one batch of ticks.")
+SERIALIZE = Histogram("straddle_serialize_seconds", "Time to encode one index's tick into every wire format.")
+SEND = Histogram("straddle_send_seconds", "Time to send one frame to one WebSocket client.")
+TICK_AGE = Histogram(
+    "straddle_tick_age_seconds", "Age of a tick when it is sent to a WebSocket client.", ["index"]
+)
+RATE_LIMITED = Counter("straddle_rate_limited_total", "Quotes calls answered with HTTP 429.")
+API_ERRORS = Counter("straddle_api_errors_total", "Failed quotes calls, by reason.", ["reason"])
+CONNECTED_CLIENTS = Gauge("straddle_connected_clients", "Open WebSocket connections.")
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('straddle', '0006_straddleprice_ltp'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='straddleprice',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
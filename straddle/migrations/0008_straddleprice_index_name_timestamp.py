@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('straddle', '0007_alter_straddleprice_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='straddleprice',
+            index=models.Index(fields=['index_name', 'timestamp'], name='straddle_index_name_ts_idx'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
+from django.utils import timezone
 
 class StraddlePrice(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
     index_name = models.CharField(max_length=50, default="NIFTY")  # Renamed from index_name
     atm_strike = models.PositiveIntegerField()
     call_price = models.FloatField()
@@ -16,6 +17,9 @@ class StraddlePrice(models.Model):
         verbose_name = "Straddle Price"
         verbose_name_plural = "Straddle Prices"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['index_name', 'timestamp'], name='straddle_index_name_ts_idx'),
+        ]
 
 # from django.db import models
 
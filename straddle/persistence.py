@@ -0,0 +1,106 @@
+import time
+import atexit
+import asyncio
+import logging
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from .models import StraddlePrice
+from .metrics import DB_WRITE
+
+
+class TickWriter:
+    """Write-behind buffer that persists StraddlePrice ticks in bulk.
+
+    Ticks are collected in memory and written with a single bulk_create
+    transaction every `batch_size` rows or `flush_interval` seconds,
+    whichever comes first. When the buffer is full the oldest tick is
+    dropped, and anything still buffered is flushed on shutdown.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None, capacity=None):
+        self.batch_size = batch_size or getattr(settings, "STRADDLE_DB_BATCH_SIZE", 60)
+        self.flush_interval = flush_interval or getattr(settings, "STRADDLE_DB_FLUSH_MS", 1000) / 1000
+        self.capacity = capacity or getattr(settings, "STRADDLE_DB_BUFFER_CAPACITY", 10000)
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._buffer = deque()
+        self._wakeup = None
+        self._task = None
+        atexit.register(self.flush_sync)
+
+    @property
+    def queue_depth(self):
+        return len(self._buffer)
+
+    def add(self, **fields):
+        """Queue one StraddlePrice row for the next flush."""
+        if len(self._buffer) >= self.capacity:
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append(StraddlePrice(**fields))
+        if self._wakeup is not None and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        """Stop the flush loop and write out whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        rows, self._buffer = list(self._buffer), deque()
+        await asyncio.to_thread(self.write, rows)
+
+    def flush_sync(self):
+        if self._buffer:
+            rows, self._buffer = list(self._buffer), deque()
+            self.write(rows)
+
+    def write(self, rows):
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                StraddlePrice.objects.bulk_create(rows)
+        except Exception as e:
+            self.dropped += len(rows)
+            logging.error(f"Database Save Error: {e}")
+            return
+
+        elapsed = time.perf_counter() - start
+        DB_WRITE.observe(elapsed)
+        self.last_flush_ms = elapsed * 1000
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+        self.flushed += len(rows)
+        self.flushes += 1
+        logging.debug(f"Flushed {len(rows)} ticks in {self.last_flush_ms:.1f}ms")
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+        }
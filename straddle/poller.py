@@ -0,0 +1,408 @@
+import math
+import time
+import asyncio
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+from .persistence import TickWriter
+from .ratelimit import RateLimiter
+from .indices import INDEX_KEYS, INSTRUMENTS
+from .ringbuffer import TickRing
+from .surface import SurfaceRing, chunked
+from .symbolmaster import option_legs
+from .wire import TickEncoder
+from .hub import encode_tick, group_for
+from .leader import LeaderLock, SharedWatchers
+from .providers import load_provider
+from .metrics import QUOTE_RTT, SERIALIZE, API_ERRORS
+from . import metrics
+from .greeks import straddle_analytics
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+logger = logging.getLogger(__name__)
+
+
+class StraddlePoller:
+    """Process-wide market-data poller shared by every connected dashboard.
+
+    The first subscriber starts the polling task and the last one to leave
+    stops it, so quote calls and DB writes happen once per tick no matter
+    how many WebSocket clients are open. Subscribers are also counted per
+    index and indices nobody watches are neither quoted nor stored. Ticks
+    are persisted through a write-behind TickWriter rather than one INSERT
+    per row.
+
+    With STRADDLE_LEADER_LOCK set, several worker processes share one
+    cross-process channel layer and only the holder of the lock polls.
+    Every worker heartbeats the indices its own clients watch over the
+    layer, and the leader polls the union of those sets, idling when it is
+    empty. The leader keeps running after its own last client leaves, so
+    the other workers' clients are still served.
+    """
+
+    def __init__(self, interval=1, workers=None, timeout=None, provider=None):
+        self.interval = interval
+        self.workers = workers or getattr(settings, "STRADDLE_FETCH_WORKERS", 6)
+        self.timeout = timeout or getattr(settings, "STRADDLE_FETCH_TIMEOUT", 5)
+        self.batch_quotes = getattr(settings, "STRADDLE_BATCH_QUOTES", True)
+        self.limiter = RateLimiter(
+            limits=getattr(settings, "STRADDLE_RATE_LIMITS", ((10, 1), (200, 60))),
+            max_retries=getattr(settings, "STRADDLE_MAX_RETRIES", 3),
+        )
+        self.writer = TickWriter()
+        self.encoder = TickEncoder()
+        depth = getattr(settings, "STRADDLE_HISTORY_DEPTH", 23400)
+        self.history = {index_type: TickRing(depth) for index_type in INDEX_KEYS}
+        self.band = getattr(settings, "STRADDLE_STRIKE_BAND", 0)
+        self.symbol_limit = getattr(settings, "STRADDLE_QUOTES_SYMBOL_LIMIT", 50)
+        # Expiry of the legs last quoted per index, for the ATM IV's time to expiry.
+        self.expiries = {}
+        surface_depth = getattr(settings, "STRADDLE_SURFACE_DEPTH", 3600)
+        self.surfaces = {
+            index_type: SurfaceRing(surface_depth, self.band, instrument.strike_step)
+            for index_type, instrument in INSTRUMENTS.items()
+        } if self.band else {}
+        self.subscribers = 0
+        self.watchers = Counter()
+        lock_path = getattr(settings, "STRADDLE_LEADER_LOCK", None)
+        self.leader = LeaderLock(lock_path) if lock_path else None
+        self.shared = SharedWatchers(getattr(settings, "STRADDLE_WATCH_TTL", 15)) if lock_path else None
+        self._task = None
+        self._executor = None
+        self._provider = provider
+
+    @property
+    def executor(self):
+        """Bounded thread pool all blocking quote and DB calls run on."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="straddle-fetch")
+        return self._executor
+
+    @property
+    def provider(self):
+        """Quote provider from STRADDLE_QUOTE_PROVIDER, built on first use."""
+        if self._provider is None:
+            self._provider = load_provider()
+        return self._provider
+
+    @property
+    def active_indices(self):
+        """Indices with at least one watcher in this or another worker, in INDEX_KEYS order."""
+        shared = self.shared.union() if self.shared is not None else set()
+        return [index_type for index_type in INDEX_KEYS if self.watchers[index_type] > 0 or index_type in shared]
+
+    def watch(self, index_types):
+        """Count a subscriber's interest in some indices so they get polled."""
+        self.watchers.update(index_types)
+
+    def unwatch(self, index_types):
+        self.watchers.subtract(index_types)
+        self.watchers = +self.watchers
+
+    def subscribe(self):
+        """Register a subscriber, starting the polling task if needed."""
+        self.subscribers += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+            logging.info("Straddle poller started.")
+
+    def unsubscribe(self):
+        """Drop a subscriber, stopping the polling task when none are left.
+
+        The leader keeps polling for the clients of other workers; it goes
+        idle once none of them watch anything.
+        """
+        self.subscribers = max(self.subscribers - 1, 0)
+        if self.subscribers == 0 and self._task is not None and not (self.leader is not None and self.leader.held):
+            self._task.cancel()
+            self._task = None
+            logging.info("Straddle poller stopped, no subscribers left.")
+
+    async def run(self):
+        channel_layer = get_channel_layer()
+        self.writer.start()
+        if self.shared is not None:
+            self.shared.start(channel_layer)
+        try:
+            while True:
+                try:
+                    if self.shared is not None:
+                        await self.shared.heartbeat(channel_layer, +self.watchers)
+                    # Unless this worker leads, another one is polling and its
+                    # ticks reach us through the channel layer.
+                    if self.leader is None or self.leader.acquire():
+                        index_types = self.active_indices
+                        if index_types:
+                            payload = await self.poll_once(index_types)
+                            await self.publish(channel_layer, payload, index_types)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(f"Poller Error: {e}")
+
+                await asyncio.sleep(self.interval)
+        finally:
+            await self.writer.stop()
+            if self.shared is not None:
+                await self.shared.stop(channel_layer)
+            if self.leader is not None:
+                self.leader.release()
+
+    async def publish(self, channel_layer, payload, index_types):
+        """Send each index's tick to that index's group, encoded once."""
+        for index_type in index_types:
+            start = time.perf_counter()
+            tick = encode_tick(self.encoder, index_type, payload)
+            SERIALIZE.observe(time.perf_counter() - start)
+            await channel_layer.group_send(group_for(index_type), tick.message())
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking call on the bounded executor, giving up after the timeout."""
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self.executor, func, *args), self.timeout)
+
+    async def fetch_all(self, index_types, day=None):
+        """Fetch the given indices, either batched or concurrently per index.
+
+        Option legs are those of the nearest expiry on or after `day`, today by default.
+        """
+        # Only the batched path quotes strike bands.
+        if self.batch_quotes or self.band:
+            return await self.get_all_atm_straddles(index_types, day)
+
+        results = await asyncio.gather(*(self.get_atm_straddle(index_type, day) for index_type in index_types))
+        return dict(zip(index_types, results))
+
+    async def poll_once(self, index_types=INDEX_KEYS, now=None):
+        """Fetch the given indices once, persist them and return the tick payload.
+
+        A replay passes the recorded time as `now`: legs are then resolved
+        against that day's expiries and the rows and ATM IVs are as of it.
+        """
+        index_types = list(index_types)
+        day = now.astimezone().date() if now is not None else None
+        results = await self.fetch_all(index_types, day)
+        return self.record(results, now or timezone.now())
+
+    def record(self, results, now):
+        """Buffer and remember one tick of (atm_strike, call, put, ltp) results, returning its payload."""
+        timestamp = now.astimezone().strftime("%H:%M:%S")
+        payload = {"timestamp": timestamp, "ts": now.timestamp()}
+        ivs = self.atm_ivs(results, now.timestamp())
+
+        for index_type, data in results.items():
+            key = INDEX_KEYS[index_type]
+            if not data:
+                payload[key] = None
+                continue
+
+            atm_strike, call_price, put_price, ltp = data[:4]
+            straddle_price = call_price + put_price
+            self.writer.add(
+                timestamp=now,
+                index_name=index_type,
+                atm_strike=atm_strike,
+                call_price=call_price,
+                put_price=put_price,
+                straddle_price=straddle_price,
+                ltp=ltp,
+            )
+            self.history[index_type].append(now.timestamp(), atm_strike, call_price, put_price, straddle_price, ltp)
+            payload[key] = {
+                "atm_strike": atm_strike,
+                "call_price": call_price,
+                "put_price": put_price,
+                "straddle_price": straddle_price,
+                "ltp": ltp,
+                "atm_iv": ivs.get(index_type),
+            }
+            if len(data) > 4 and index_type in self.surfaces:
+                calls, puts = data[4]
+                self.surfaces[index_type].append(
+                    now.timestamp(), atm_strike, [math.nan if c is None else c for c in calls],
+                    [math.nan if p is None else p for p in puts],
+                )
+                payload[key]["surface"] = {"step": self.surfaces[index_type].step, "call": calls, "put": puts}
+
+        return payload
+
+    def atm_ivs(self, results, ts):
+        """ATM implied volatility of every priced index this tick, solved in one batch."""
+        priced = {index_type: data for index_type, data in results.items() if data}
+        if not priced:
+            return {}
+        strikes, calls, puts, ltps = zip(*(data[:4] for data in priced.values()))
+        expiries = [self.expiries.get(index_type) for index_type in priced]
+        try:
+            ivs = straddle_analytics(
+                list(priced), [ts] * len(priced), ltps, strikes, calls, puts,
+                expiries=expiries if None not in expiries else None,
+            )["atm_iv"]
+        except Exception as e:
+            logging.error(f"IV Error: {e}")
+            return {}
+        return {index_type: None if iv != iv else round(float(iv), 6) for index_type, iv in zip(priced, ivs)}
+
+    async def get_atm_straddle(self, index_type, day=None):
+        try:
+            instrument = INSTRUMENTS.get(index_type)
+            if not instrument:
+                logging.error("Invalid Index Type: %s", index_type)
+                return None
+            symbol = instrument.spot_symbol
+
+            spot_quotes = await self.fetch_quotes([symbol], "spot")
+            if spot_quotes is None:
+                return None
+
+            ltp = spot_quotes.get(symbol)
+            if ltp is None:
+                logging.error("LTP not found in response")
+                return None
+
+            atm_strike, (atm_call_symbol,), (atm_put_symbol,), expiry = option_legs(index_type, ltp, day=day)
+
+            option_quotes = await self.fetch_quotes([atm_call_symbol, atm_put_symbol], "option")
+            if option_quotes is None:
+                return None
+
+            call_price = option_quotes.get(atm_call_symbol)
+            put_price = option_quotes.get(atm_put_symbol)
+            if call_price is None or put_price is None:
+                logging.error("Failed to fetch option prices")
+                return None
+
+            self.expiries[index_type] = expiry
+            return atm_strike, call_price, put_price,ltp
+
+        except asyncio.TimeoutError:
+            API_ERRORS.inc("timeout")
+            logging.error(f"Timed out fetching {index_type} after {self.timeout}s")
+            return None
+        except Exception as e:
+            API_ERRORS.inc("exception")
+            logging.error(f"API Error: {e}")
+            return None
+
+    async def get_all_atm_straddles(self, index_types, day=None):
+        """Fetch ATM straddles for several indices with two batched quotes calls.
+
+        All spot symbols go out in one comma-joined request, then every ATM
+        CE/PE leg derived from those spots goes out in a second one. Returns
+        a dict of index type -> (atm_strike, call_price, put_price, ltp), or
+        None for indices that could not be priced this tick.
+
+        With a STRADDLE_STRIKE_BAND of N, the legs of the N strikes either
+        side of ATM are quoted too, in as few calls as the symbol limit
+        allows, and each result gains a fifth item: the band's (calls, puts)
+        prices, lowest strike first, None where a leg was not quoted.
+        """
+        results = dict.fromkeys(index_types)
+        try:
+            spot_symbols = {INSTRUMENTS[index_type].spot_symbol: index_type for index_type in index_types}
+            spot_quotes = await self.fetch_chunked(list(spot_symbols), "spot")
+            if spot_quotes is None:
+                return results
+
+            legs = {}
+            for symbol, index_type in spot_symbols.items():
+                ltp = spot_quotes.get(symbol)
+                if ltp is None:
+                    logging.error("LTP not found for %s", symbol)
+                    continue
+                atm_strike, call_symbols, put_symbols, expiry = option_legs(index_type, ltp, self.band, day)
+                legs[index_type] = (atm_strike, ltp, call_symbols, put_symbols)
+                self.expiries[index_type] = expiry
+
+            if not legs:
+                return results
+
+            option_quotes = await self.fetch_chunked(
+                [symbol for _, _, calls, puts in legs.values() for symbol in calls + puts if symbol], "option"
+            )
+            if option_quotes is None:
+                return results
+
+            for index_type, (atm_strike, ltp, call_symbols, put_symbols) in legs.items():
+                call_price = option_quotes.get(call_symbols[self.band])
+                put_price = option_quotes.get(put_symbols[self.band])
+                if call_price is None or put_price is None:
+                    logging.error("Failed to fetch option prices for %s", index_type)
+                    continue
+                results[index_type] = (atm_strike, call_price, put_price, ltp)
+                if self.band:
+                    band = ([option_quotes.get(s) for s in call_symbols], [option_quotes.get(s) for s in put_symbols])
+                    results[index_type] += (band,)
+
+        except asyncio.TimeoutError:
+            API_ERRORS.inc("timeout")
+            logging.error(f"Timed out fetching batched quotes after {self.timeout}s")
+        except Exception as e:
+            API_ERRORS.inc("exception")
+            logging.error(f"Batch API Error: {e}")
+
+        return results
+
+    async def fetch_chunked(self, symbols, kind):
+        """Quote any number of symbols in concurrent calls of at most STRADDLE_QUOTES_SYMBOL_LIMIT each.
+
+        Returns the merged symbol -> LTP dict, or None if every call failed.
+        """
+        chunks = chunked(symbols, self.symbol_limit)
+        if len(chunks) == 1:
+            return await self.fetch_quotes(chunks[0], kind)
+        responses = await asyncio.gather(*(self.fetch_quotes(chunk, kind) for chunk in chunks))
+        if all(response is None for response in responses):
+            return None
+        quotes = {}
+        for response in responses:
+            quotes.update(response or {})
+        return quotes
+
+    def quote(self, request, kind):
+        """One blocking quotes call, timed as a spot or option round trip."""
+        start = time.perf_counter()
+        try:
+            return self.provider.quotes(request)
+        finally:
+            QUOTE_RTT.observe(time.perf_counter() - start, kind)
+
+    async def fetch_quotes(self, symbols, kind="spot"):
+        """Quote several symbols in one rate-limited call, returning a symbol -> LTP dict."""
+        request = {"symbols": ",".join(symbols)}
+        response = await self.limiter.call(lambda: self.run_blocking(self.quote, request, kind))
+        if response is None:
+            API_ERRORS.inc("rate_limited")
+            return None
+
+        if not response or "d" not in response:
+            API_ERRORS.inc("invalid_response")
+            logging.error("Invalid API Response: %s", response)
+            return None
+
+        quotes = {}
+        for data in response["d"]:
+            values = data.get("v")
+            if isinstance(values, dict) and values.get("lp") is not None:
+                quotes[data.get("n")] = values["lp"]
+        return quotes
+
+
+poller = StraddlePoller()
+
+metrics.Gauge("straddle_db_queue_depth", "Ticks buffered for the next bulk insert.",
+              func=lambda: poller.writer.queue_depth)
+metrics.Counter("straddle_db_rows_flushed_total", "Ticks written to the database.",
+                func=lambda: poller.writer.flushed)
+metrics.Counter("straddle_db_rows_dropped_total", "Ticks dropped from a full write buffer.",
+                func=lambda: poller.writer.dropped)
+metrics.Counter("straddle_db_flushes_total", "Bulk inserts run.", func=lambda: poller.writer.flushes)
+metrics.Counter("straddle_quotes_throttled_total", "Quotes calls delayed by the client-side rate limiter.",
+                func=lambda: poller.limiter.throttled)
+metrics.Counter("straddle_quotes_dropped_total", "Quotes calls given up after repeated HTTP 429s.",
+                func=lambda: poller.limiter.dropped)
@@ -0,0 +1,168 @@
+import os
+import time
+import random
+import logging
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .recording import QuoteRecorder, read_records
+
+
+class QuoteProvider:
+    """Source of quote responses for the poller.
+
+    `quotes(request)` takes the Fyers request dict ({"symbols": "A,B"}) and
+    returns a response in the Fyers shape: {"code": 200, "s": "ok", "d":
+    [{"n": symbol, "v": {"lp": ltp}}, ...]}, or {"code": 429, ...} when
+    throttled. It is called from the poller's worker threads and may block.
+    """
+
+    def quotes(self, request):
+        raise NotImplementedError
+
+
+def fyers_credentials():
+    """(client_id, access_token) from the environment or .env, raising if either is missing."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    client_id = os.getenv("FYERS_CLIENT_ID")
+    access_token = os.getenv("FYERS_ACCESS_TOKEN")
+    if not access_token or not client_id:
+        raise ValueError("Missing Fyers API credentials. Check your .env file.")
+    return client_id, access_token
+
+
+class FyersProvider(QuoteProvider):
+    """Live quotes from the Fyers REST API, using credentials from the environment or .env."""
+
+    def __init__(self, client_id=None, access_token=None):
+        from fyers_apiv3 import fyersModel
+
+        if not client_id or not access_token:
+            client_id, access_token = fyers_credentials()
+        self.client_id = client_id
+        self.access_token = access_token
+        self.fyers = fyersModel.FyersModel(client_id=self.client_id, token=self.access_token, is_async=False)
+
+    def quotes(self, request):
+        return self.fyers.quotes(request)
+
+
+class ReplayProvider(QuoteProvider):
+    """Serve responses recorded earlier, in order, from a JSON-lines file, gzipped or plain.
+
+    Each line is {"t": epoch, "request": {...}, "response": {...}}. A request
+    is answered with the next recorded response for the same symbols, so a
+    replayed session prices exactly the strikes it priced live. The file is
+    replayed from the start again once exhausted if `loop` is set.
+    """
+
+    def __init__(self, path, loop=True):
+        self.path = str(path)
+        self.loop = loop
+        self.records = list(read_records(self.path))
+        if not self.records:
+            raise ValueError(f"No recorded quotes in {self.path}.")
+        self.position = 0
+        self._lock = threading.Lock()
+
+    def quotes(self, request):
+        with self._lock:
+            for step in range(len(self.records)):
+                index = self.position + step
+                if index >= len(self.records):
+                    if not self.loop:
+                        break
+                    index %= len(self.records)
+                record = self.records[index]
+                if record["request"].get("symbols") == request.get("symbols"):
+                    self.position = index + 1
+                    return record["response"]
+        return {"code": 404, "s": "error", "message": "No recorded response for these symbols."}
+
+
+class SyntheticProvider(QuoteProvider):
+    """Random-walk quotes with simulated network latency and injected HTTP 429s.
+
+    Spots move one step per quotes call that includes any spot symbol, and
+    option legs are priced off the current spot, so the straddle behaves
+    plausibly. `latency` and `jitter` are in seconds; `rate_limit_rate` and
+    `error_rate` are the chances of a call returning a 429 or an API error.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.02, rate_limit_rate=0.0, error_rate=0.0, volatility=0.0002, seed=None):
+        from .feedsim import MarketSimulator
+
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.market = MarketSimulator(volatility=volatility, seed=seed)
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def quotes(self, request):
+        with self._lock:
+            self.calls += 1
+            delay = max(self.latency + self.rng.uniform(-self.jitter, self.jitter), 0)
+            roll = self.rng.random()
+            symbols = request.get("symbols", "").split(",")
+            if roll >= self.rate_limit_rate + self.error_rate and any(
+                symbol in self.market.spot_index for symbol in symbols
+            ):
+                self.market.step()
+            quotes = {symbol: self.market.ltp(symbol) for symbol in symbols}
+
+        if delay:
+            time.sleep(delay)
+        if roll < self.rate_limit_rate:
+            return {"code": 429, "s": "error", "message": "request limit reached"}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return {"code": 500, "s": "error", "message": "simulated API error"}
+        return {
+            "code": 200,
+            "s": "ok",
+            "d": [
+                {"n": symbol, "s": "ok", "v": {"lp": ltp}}
+                if ltp is not None
+                else {"n": symbol, "s": "error", "v": {"errmsg": "invalid symbol"}}
+                for symbol, ltp in quotes.items()
+            ],
+        }
+
+
+class RecordingProvider(QuoteProvider):
+    """Wrap another provider, appending every raw response it returns to a QuoteRecorder."""
+
+    def __init__(self, provider, recorder):
+        self.provider = provider
+        self.recorder = recorder
+
+    def quotes(self, request):
+        response = self.provider.quotes(request)
+        self.recorder.record(request, response)
+        return response
+
+
+PROVIDERS = {
+    "fyers": FyersProvider,
+    "replay": ReplayProvider,
+    "synthetic": SyntheticProvider,
+}
+
+
+def load_provider(config=None):
+    """Build the quote provider named by STRADDLE_QUOTE_PROVIDER (or `config`)."""
+    config = config or getattr(settings, "STRADDLE_QUOTE_PROVIDER", {"BACKEND": "fyers"})
+    backend = config.get("BACKEND", "fyers")
+    cls = PROVIDERS.get(backend) or import_string(backend)
+    provider = cls(**config.get("OPTIONS", {}))
+    logging.info(f"Using {cls.__name__} for quotes.")
+
+    record_path = getattr(settings, "STRADDLE_RECORD_QUOTES", None)
+    if record_path:
+        provider = RecordingProvider(provider, QuoteRecorder(record_path))
+        logging.info(f"Recording raw quote responses to {record_path}.")
+    return provider
@@ -0,0 +1,96 @@
+import time
+import random
+import asyncio
+import logging
+from .metrics import RATE_LIMITED
+
+
+class TokenBucket:
+    """Allow `rate` requests per `per` seconds, refilling continuously."""
+
+    def __init__(self, rate, per):
+        self.capacity = rate
+        self.refill_rate = rate / per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def delay(self, now):
+        """Seconds until one token is available (0 if one is available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.refill_rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Shared async rate limiter for every Fyers API call.
+
+    Callers wait for a token from every bucket before a request goes out, so
+    all pollers in the process stay under the broker's quotas together. A
+    429 response is retried with jittered exponential backoff up to
+    `max_retries` times, after which the request is dropped.
+    """
+
+    def __init__(self, limits=((10, 1), (200, 60)), max_retries=3, base_backoff=1.0, max_backoff=30.0):
+        self.buckets = [TokenBucket(rate, per) for rate, per in limits]
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.throttled = 0
+        self.rate_limited = 0
+        self.dropped = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until every bucket has a token, then take one from each."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = max((bucket.delay(now) for bucket in self.buckets), default=0)
+                if wait <= 0:
+                    for bucket in self.buckets:
+                        bucket.take()
+                    return
+                self.throttled += 1
+                await asyncio.sleep(wait)
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given retry attempt."""
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    async def call(self, request):
+        """Await `request()` under the limiter, retrying on HTTP 429.
+
+        Returns the response, or None if it was still rate limited after
+        `max_retries` retries.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire()
+            response = await request()
+            if not (isinstance(response, dict) and response.get("code") == 429):
+                return response
+
+            self.rate_limited += 1
+            RATE_LIMITED.inc()
+            if attempt < self.max_retries:
+                delay = self.backoff(attempt)
+                logging.warning(f"API Rate Limit Reached. Retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+        self.dropped += 1
+        logging.error(f"API Rate Limit Reached. Dropping request after {self.max_retries} retries")
+        return None
+
+    def stats(self):
+        return {
+            "throttled": self.throttled,
+            "rate_limited": self.rate_limited,
+            "dropped": self.dropped,
+        }
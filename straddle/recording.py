@@ -0,0 +1,144 @@
+import gzip
+import json
+import datetime
+import atexit
+import time
+import asyncio
+import logging
+import threading
+import zlib
+from channels.layers import get_channel_layer
+from .indices import SPOT_SYMBOLS
+
+
+class QuoteRecorder:
+    """Append raw quote responses, with timestamps, to a gzipped JSON-lines log.
+
+    Each line is {"t": epoch, "request": {...}, "response": {...}}, the
+    format ReplayProvider reads. Reopening an existing file appends a new
+    gzip member, which gzip readers treat as one continuous stream. The
+    stream is sync-flushed every `flush_every` records, so a crash loses at
+    most that many and leaves everything before it readable.
+    """
+
+    def __init__(self, path, flush_every=20):
+        self.path = str(path)
+        self.flush_every = flush_every
+        self.records = 0
+        self._file = gzip.open(self.path, "ab")
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def record(self, request, response, t=None):
+        line = json.dumps({"t": t or time.time(), "request": request, "response": response}, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line.encode() + b"\n")
+            self.records += 1
+            if self.records % self.flush_every == 0:
+                self._file.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def is_gzip(path):
+    with open(path, "rb") as f:
+        return f.read(2) == b"\x1f\x8b"
+
+
+def read_records(path):
+    """Yield the records of a recorded quotes log, stopping quietly at a truncated tail.
+
+    Gzipped logs are recognised by their magic bytes, whatever they are named.
+    """
+    path = str(path)
+    opener = gzip.open if is_gzip(path) else open
+    with opener(path, "rt") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, OSError, ValueError, zlib.error) as e:
+            logging.warning(f"Stopped reading {path} at a truncated record: {e}")
+
+
+def recorded_ticks(records):
+    """Group records into poller ticks, yielding (timestamp, index types) per tick.
+
+    A tick starts with the quotes call(s) carrying spot symbols; it ends
+    when a spot already seen in the current tick is requested again, other
+    than as the retry of a rate-limited call.
+    """
+    spot_index = {symbol: index_type for index_type, symbol in SPOT_SYMBOLS.items()}
+    started, index_types, previous = None, [], None
+    for record in records:
+        request = record["request"]
+        retry = previous is not None and previous["request"] == request and previous["response"].get("code") == 429
+        previous = record
+        spots = [spot_index[symbol] for symbol in request.get("symbols", "").split(",") if symbol in spot_index]
+        if not spots or retry:
+            continue
+        if started is not None and any(index_type in index_types for index_type in spots):
+            yield started, index_types
+            started, index_types = None, []
+        if started is None:
+            started = record["t"]
+        index_types += [index_type for index_type in spots if index_type not in index_types]
+    if started is not None:
+        yield started, index_types
+
+
+class ReplayDriver:
+    """Feed a recorded session back through the poller's fetch, persist and publish path.
+
+    `speed` is a multiple of real time (1 replays at the recorded pace, 10
+    ten times faster); None replays as fast as the pipeline allows. Each
+    tick runs as of its recorded time, so option symbols name the expiry
+    that was live then and rows are stamped when they were recorded.
+    Ticks are published to `channel_layer`, the configured one by default.
+    """
+
+    def __init__(self, path, speed=1.0, poller=None, channel_layer=None):
+        from .poller import StraddlePoller
+        from .providers import ReplayProvider
+        from .ratelimit import RateLimiter
+
+        self.path = str(path)
+        self.speed = speed
+        self.poller = poller or StraddlePoller(provider=ReplayProvider(self.path, loop=False))
+        # Recorded 429s replay as recorded and are retried at once; quotas do not apply offline.
+        self.poller.limiter = RateLimiter(limits=(), base_backoff=0)
+        self.channel_layer = channel_layer
+        self.ticks = 0
+        self.elapsed = 0.0
+
+    async def run(self):
+        channel_layer = self.channel_layer or get_channel_layer()
+        self.poller.writer.start()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = None
+        try:
+            for t, index_types in recorded_ticks(read_records(self.path)):
+                if self.speed:
+                    first = first if first is not None else t
+                    delay = (t - first) / self.speed - (loop.time() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                now = datetime.datetime.fromtimestamp(t, tz=datetime.timezone.utc)
+                payload = await self.poller.poll_once(index_types, now)
+                await self.poller.publish(channel_layer, payload, index_types)
+                self.ticks += 1
+        finally:
+            self.elapsed = loop.time() - started
+            await self.poller.writer.stop()
+
+    def stats(self):
+        rate = self.ticks / self.elapsed if self.elapsed else 0.0
+        return {
+            "ticks": self.ticks,
+            "rows_written": self.poller.writer.flushed,
+            "elapsed_s": round(self.elapsed, 3),
+            "ticks_per_s": round(rate, 1),
+        }
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+# Columns stored for every tick, in order.
+FIELDS = ("timestamp", "strike", "call", "put", "straddle", "ltp")
+
+
+class TickRing:
+    """Fixed-size ring buffer of one index's ticks.
+
+    Storage is a preallocated (2 * capacity, len(FIELDS)) float64 array and
+    each row is written twice, at `i` and `i + capacity`. The newest `n`
+    rows are therefore always one contiguous slice, so append is O(1) and
+    window() returns a view without copying.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = 0
+        self._data = np.full((2 * capacity, len(FIELDS)), np.nan)
+        self._next = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, strike, call, put, straddle, ltp):
+        row = (timestamp, strike, call, put, straddle, ltp)
+        self._data[self._next] = row
+        self._data[self._next + self.capacity] = row
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def window(self, n=None):
+        """View of the newest `n` rows (all of them by default), oldest first."""
+        n = self.count if n is None else min(n, self.count)
+        end = self._next + self.capacity
+        return self._data[end - n:end]
+
+    def since(self, timestamp):
+        """View of the rows with an epoch timestamp >= `timestamp`."""
+        rows = self.window()
+        return rows[np.searchsorted(rows[:, 0], timestamp):]
+
+    def latest(self):
+        """The newest row, or None if the buffer is empty."""
+        return self.window(1)[0] if self.count else None
@@ -0,0 +1,261 @@
+import json
+import math
+import time
+import asyncio
+import logging
+from channels.layers import get_channel_layer
+from django.utils import timezone
+from .indices import INDEX_KEYS, INSTRUMENTS
+from .providers import fyers_credentials
+from .symbolmaster import option_legs
+
+
+class SimulatedFeed:
+    """Client for a local `manage.py run_feed_simulator` server."""
+
+    def __init__(self, host="127.0.0.1", port=8765):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        logging.info(f"Connected to feed simulator at {self.host}:{self.port}.")
+
+    async def request(self, action, symbols):
+        self._writer.write((json.dumps({"action": action, "symbols": symbols}) + "\n").encode())
+        await self._writer.drain()
+
+    async def subscribe(self, symbols):
+        await self.request("subscribe", symbols)
+
+    async def unsubscribe(self, symbols):
+        await self.request("unsubscribe", symbols)
+
+    async def __aiter__(self):
+        while line := await self._reader.readline():
+            yield json.loads(line)
+        raise ConnectionError("Feed simulator closed the connection.")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class FyersFeed:
+    """Fyers data socket (lite mode), with its callback thread bridged onto the event loop."""
+
+    def __init__(self, client_id, access_token):
+        self.client_id = client_id
+        self.access_token = access_token
+        self._socket = None
+        self._messages = None
+
+    async def connect(self):
+        from fyers_apiv3.FyersWebsocket import data_ws
+
+        loop = asyncio.get_running_loop()
+        self._messages = asyncio.Queue()
+        connected = asyncio.Event()
+        self._socket = data_ws.FyersDataSocket(
+            access_token=f"{self.client_id}:{self.access_token}",
+            litemode=True,
+            reconnect=True,
+            on_message=lambda message: loop.call_soon_threadsafe(self._messages.put_nowait, message),
+            on_error=lambda message: logging.error(f"Fyers Data Socket Error: {message}"),
+            on_connect=lambda: loop.call_soon_threadsafe(connected.set),
+        )
+        await asyncio.to_thread(self._socket.connect)
+        await connected.wait()
+        logging.info("Connected to Fyers data socket.")
+
+    async def subscribe(self, symbols):
+        await asyncio.to_thread(self._socket.subscribe, symbols=symbols, data_type="SymbolUpdate")
+
+    async def unsubscribe(self, symbols):
+        await asyncio.to_thread(self._socket.unsubscribe, symbols=symbols, data_type="SymbolUpdate")
+
+    async def __aiter__(self):
+        while True:
+            yield await self._messages.get()
+
+    async def close(self):
+        if self._socket is not None:
+            await asyncio.to_thread(self._socket.close_connection)
+            self._socket = None
+
+
+def open_feed(spec):
+    """Build a feed from "fyers" or the "host:port" of a feed simulator."""
+    if spec == "fyers":
+        return FyersFeed(*fyers_credentials())
+    host, _, port = spec.rpartition(":")
+    return SimulatedFeed(host or "127.0.0.1", int(port))
+
+
+class StraddleStream:
+    """Push-based alternative to polling: builds ATM straddles from a streaming tick feed.
+
+    Keeps the latest LTP of every subscribed spot and ATM leg in memory.
+    A spot tick may roll the index to a new ATM strike, swapping the
+    subscribed CE/PE legs; any spot or leg tick then recomputes that
+    index's straddle. At most once per poller interval per index the
+    latest straddle is pushed through the poller's persistence, history
+    and publish path, so consumers cannot tell the two apart and the
+    table and rings fill at the polling rate rather than the feed's.
+    A dropped feed connection is reopened with backoff.
+    """
+
+    # Roll to a new strike only once spot is this many strike steps from the current one,
+    # so a spot hovering between two strikes does not churn subscriptions.
+    ROLL_BAND = 0.6
+    # Seconds before the first reconnect attempt, doubling up to the maximum.
+    RECONNECT_DELAY = 1
+    MAX_RECONNECT_DELAY = 30
+
+    def __init__(self, poller, feed, index_types=INDEX_KEYS):
+        self.poller = poller
+        self.feed = feed
+        self.index_types = list(index_types)
+        self.ltps = {}
+        self.legs = {}
+        self.routes = {INSTRUMENTS[index_type].spot_symbol: index_type for index_type in self.index_types}
+        # Straddles recomputed since their index was last emitted, and when that was.
+        self.pending = {}
+        self.emitted = {}
+        self.messages = 0
+        self.recomputed = 0
+        self.emits = 0
+        self.rolls = 0
+        self.reconnects = 0
+
+    async def run(self):
+        leader = self.poller.leader
+        while leader is not None and not leader.acquire():
+            await asyncio.sleep(1)
+
+        channel_layer = get_channel_layer()
+        self.poller.writer.start()
+        flusher = asyncio.get_running_loop().create_task(self.flush(channel_layer))
+        delay = self.RECONNECT_DELAY
+        try:
+            while True:
+                try:
+                    await self.feed.connect()
+                    # Spots plus the legs of the current strikes, after a reconnect too.
+                    await self.feed.subscribe(list(self.routes))
+                    delay = self.RECONNECT_DELAY
+                    async for message in self.feed:
+                        try:
+                            await self.on_message(channel_layer, message)
+                        except Exception as e:
+                            logging.error(f"Stream Error: {e}")
+                except (OSError, EOFError) as e:
+                    logging.warning(f"Feed connection lost ({e}); reconnecting in {delay}s")
+                await self.feed.close()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+                self.reconnects += 1
+        finally:
+            flusher.cancel()
+            await self.feed.close()
+            await self.poller.writer.stop()
+            if leader is not None:
+                leader.release()
+
+    async def on_message(self, channel_layer, message):
+        symbol = message.get("symbol")
+        ltp = message.get("ltp")
+        index_type = self.routes.get(symbol)
+        # Late ticks for legs we already rolled away from are ignored.
+        if index_type is None or ltp is None:
+            return
+        self.messages += 1
+        self.ltps[symbol] = ltp
+        if symbol == INSTRUMENTS[index_type].spot_symbol:
+            await self.roll(index_type, ltp)
+
+        data = self.straddle(index_type)
+        if data is None:
+            return
+        self.recomputed += 1
+        self.pending[index_type] = data
+        if time.monotonic() - self.emitted.get(index_type, -math.inf) >= self.poller.interval:
+            await self.emit(channel_layer, [index_type])
+
+    async def emit(self, channel_layer, index_types):
+        """Persist and publish the pending straddles of these indices as one tick."""
+        now = time.monotonic()
+        results = {}
+        for index_type in index_types:
+            results[index_type] = self.pending.pop(index_type)
+            self.emitted[index_type] = now
+        self.emits += 1
+        payload = self.poller.record(results, timezone.now())
+        await self.poller.publish(channel_layer, payload, index_types)
+
+    async def emit_due(self, channel_layer):
+        """Emit every pending straddle whose index was last emitted an interval or more ago."""
+        now = time.monotonic()
+        due = [
+            index_type for index_type in self.pending
+            if now - self.emitted.get(index_type, -math.inf) >= self.poller.interval
+        ]
+        if due:
+            await self.emit(channel_layer, due)
+
+    async def flush(self, channel_layer):
+        """Emit the last straddle of a busy interval instead of waiting for the next feed tick."""
+        while True:
+            await asyncio.sleep(self.poller.interval)
+            try:
+                await self.emit_due(channel_layer)
+            except Exception as e:
+                logging.error(f"Stream Error: {e}")
+
+    async def roll(self, index_type, ltp):
+        """Subscribe to the ATM legs for this spot, dropping the previous strike's."""
+        instrument = INSTRUMENTS[index_type]
+        current = self.legs.get(index_type)
+        if current and abs(ltp - current[0]) < self.ROLL_BAND * instrument.strike_step:
+            return
+        atm_strike, (call_symbol,), (put_symbol,), expiry = option_legs(index_type, ltp)
+        if current and current[0] == atm_strike:
+            return
+
+        legs = (atm_strike, call_symbol, put_symbol)
+        self.legs[index_type] = legs
+        self.poller.expiries[index_type] = expiry
+        for symbol in legs[1:]:
+            self.routes[symbol] = index_type
+        await self.feed.subscribe(list(legs[1:]))
+
+        if current:
+            self.rolls += 1
+            for symbol in current[1:]:
+                self.routes.pop(symbol, None)
+                self.ltps.pop(symbol, None)
+            await self.feed.unsubscribe(list(current[1:]))
+
+    def straddle(self, index_type):
+        """(atm_strike, call, put, ltp) from the latest LTPs, or None until both legs have ticked."""
+        legs = self.legs.get(index_type)
+        if not legs:
+            return None
+        atm_strike, call_symbol, put_symbol = legs
+        call_price = self.ltps.get(call_symbol)
+        put_price = self.ltps.get(put_symbol)
+        if call_price is None or put_price is None:
+            return None
+        return atm_strike, call_price, put_price, self.ltps[INSTRUMENTS[index_type].spot_symbol]
+
+    def stats(self):
+        return {
+            "messages": self.messages,
+            "recomputed": self.recomputed,
+            "emits": self.emits,
+            "rolls": self.rolls,
+            "reconnects": self.reconnects,
+        }
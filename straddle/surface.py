@@ -0,0 +1,73 @@
+import math
+import numpy as np
+
+
+def band_strikes(atm_strike, width, step):
+    """The 2 * width + 1 strikes centred on the ATM strike, lowest first."""
+    return [atm_strike + offset * step for offset in range(-width, width + 1)]
+
+
+def chunked(symbols, size):
+    """Split a symbol list into requests of at most `size` symbols."""
+    return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+
+class SurfaceRing:
+    """Strike x time straddle surface of one index, in a fixed-size ring.
+
+    Each tick stores the ATM strike and the call and put prices of the
+    strikes ATM - width * step ... ATM + width * step as one float32 row
+    (NaN where a leg was not quoted). Like TickRing, every row is written
+    twice so the newest `n` ticks are always one contiguous view.
+    """
+
+    def __init__(self, capacity, width, step):
+        self.capacity = capacity
+        self.width = width
+        self.step = step
+        self.count = 0
+        columns = 2 * width + 1
+        self._times = np.full(2 * capacity, np.nan)
+        self._atm = np.zeros(2 * capacity)
+        self._calls = np.full((2 * capacity, columns), np.nan, dtype=np.float32)
+        self._puts = np.full((2 * capacity, columns), np.nan, dtype=np.float32)
+        self._next = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, atm_strike, calls, puts):
+        for i in (self._next, self._next + self.capacity):
+            self._times[i] = timestamp
+            self._atm[i] = atm_strike
+            self._calls[i] = calls
+            self._puts[i] = puts
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def window(self, n=None):
+        """Columnar views of the newest `n` ticks, oldest first."""
+        n = self.count if n is None else min(n, self.count)
+        end = self._next + self.capacity
+        window = slice(end - n, end)
+        return {
+            "timestamps": self._times[window],
+            "atm_strike": self._atm[window],
+            "call": self._calls[window],
+            "put": self._puts[window],
+        }
+
+    def as_json(self, n=None):
+        """The surface as plain lists: one row per tick, one column per strike offset."""
+        window = self.window(n)
+        straddle = window["call"] + window["put"]
+        clean = lambda rows: [[None if math.isnan(v) else round(float(v), 2) for v in row] for row in rows]
+        return {
+            "offsets": list(range(-self.width, self.width + 1)),
+            "step": self.step,
+            "timestamps": window["timestamps"].tolist(),
+            "atm_strike": window["atm_strike"].tolist(),
+            "straddle": clean(straddle),
+            "call": clean(window["call"]),
+            "put": clean(window["put"]),
+        }
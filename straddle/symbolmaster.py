@@ -0,0 +1,250 @@
+import os
+import csv
+import time
+import bisect
+import logging
+import datetime
+import tempfile
+import functools
+import numpy as np
+from django.conf import settings
+from .expiry import expiry_calendar
+from .greeks import IST
+from .indices import INSTRUMENTS
+from .surface import band_strikes
+
+
+# Columns of the Fyers symbol-master CSVs (NSE_FO.csv, BSE_FO.csv), which have no header row.
+LOT_SIZE, EXPIRY, TICKER, UNDERLYING, STRIKE, OPTION_TYPE = 3, 8, 9, 13, 15, 16
+
+SIDES = {"CE": 0, "PE": 1}
+EPOCH = datetime.date(1970, 1, 1)
+
+# One row per listed option, sorted by (root, expiry, strike, side). Expiries
+# are days since 1970-01-01 so the whole table is fixed-width and can be
+# memory-mapped straight from disk. A saved table starts with one marker row
+# (expiry -1) per root it was built for, so a root with no listed options is
+# remembered too and the roots travel in the same file as the contracts.
+CONTRACT = np.dtype([
+    ("root", "S24"),
+    ("expiry", "<i4"),
+    ("strike", "<f8"),
+    ("side", "u1"),
+    ("lot_size", "<i4"),
+    ("symbol", "S48"),
+])
+
+
+def as_strike(strike):
+    """Whole-number strikes as ints, so they match the ones built from the strike step."""
+    return int(strike) if float(strike).is_integer() else strike
+
+
+class SymbolMaster:
+    """Every listed option of the tracked roots, indexed by (root, expiry, strike, CE/PE).
+
+    Nearest-expiry and nearest-strike lookups are a bisect over plain lists,
+    a few microseconds, so the legs to quote are resolved locally before any
+    network call and strikes or expiries the exchange does not list are
+    never requested. The chain of one (root, expiry) is unpacked from the
+    table the first time it is used and cached after that.
+    """
+
+    def __init__(self, contracts, tracked=None):
+        self.contracts = contracts
+        self._groups = {}
+        self._expiries = {}
+        self._chains = {}
+
+        root, expiry = contracts["root"], contracts["expiry"]
+        starts = np.flatnonzero((root[1:] != root[:-1]) | (expiry[1:] != expiry[:-1])) + 1
+        for start, stop in zip([0] + starts.tolist(), starts.tolist() + [len(contracts)]):
+            if start == stop:
+                continue
+            key = (root[start].decode(), int(expiry[start]))
+            self._groups[key] = (start, stop)
+            self._expiries.setdefault(key[0], []).append(key[1])
+        # Roots the table was built for, including any with no rows.
+        self.tracked = set(tracked) if tracked is not None else self.roots
+
+    def __len__(self):
+        return len(self.contracts)
+
+    @property
+    def roots(self):
+        return set(self._expiries)
+
+    @classmethod
+    def from_csv(cls, paths, roots=None):
+        """Parse the option rows of symbol-master CSVs, keeping only `roots` if given."""
+        rows = []
+        for path in paths:
+            with open(path, newline="") as f:
+                for row in csv.reader(f):
+                    if len(row) <= OPTION_TYPE or row[OPTION_TYPE] not in SIDES:
+                        continue
+                    if roots is not None and row[UNDERLYING] not in roots:
+                        continue
+                    try:
+                        expiry = datetime.datetime.fromtimestamp(int(row[EXPIRY]), IST).date()
+                        rows.append((row[UNDERLYING], (expiry - EPOCH).days, float(row[STRIKE]),
+                                     SIDES[row[OPTION_TYPE]], int(float(row[LOT_SIZE])), row[TICKER]))
+                    except ValueError:
+                        logging.warning(f"Skipping malformed symbol-master row in {path}: {row[TICKER]}")
+
+        contracts = np.array(rows, dtype=CONTRACT)
+        order = np.lexsort((contracts["side"], contracts["strike"], contracts["expiry"], contracts["root"]))
+        return cls(contracts[order], roots)
+
+    def save(self, path):
+        """Write the table and its roots as one .npy file, replacing any previous one atomically.
+
+        Every writer gets its own temporary file, so workers rebuilding the
+        cache at the same time never publish each other's half-written file.
+        """
+        markers = np.zeros(len(self.tracked), dtype=CONTRACT)
+        markers["root"] = sorted(self.tracked)
+        markers["expiry"] = -1
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.concatenate([markers, self.contracts]))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a table written by save()."""
+        table = np.load(path, mmap_mode="r")
+        if table.dtype != CONTRACT:
+            raise ValueError(f"{path} is not a symbol-master table")
+        count = int(np.count_nonzero(table["expiry"] < 0))
+        return cls(table[count:], {root.decode() for root in table["root"][:count].tolist()})
+
+    def expiry(self, root, day=None):
+        """Nearest listed expiry of `root` on or after `day`, or None."""
+        day = day or datetime.date.today()
+        expiries = self._expiries.get(root, ())
+        i = bisect.bisect_left(expiries, (day - EPOCH).days)
+        return EPOCH + datetime.timedelta(days=expiries[i]) if i < len(expiries) else None
+
+    def chain(self, root, expiry):
+        """(strikes, strike -> CE symbol, strike -> PE symbol) of one expiry.
+
+        Only strikes listed with both legs are in `strikes`, ascending.
+        """
+        key = (root, (expiry - EPOCH).days)
+        chain = self._chains.get(key)
+        if chain is None:
+            start, stop = self._groups.get(key, (0, 0))
+            rows = self.contracts[start:stop]
+            legs = ({}, {})
+            for strike, side, symbol in zip(rows["strike"].tolist(), rows["side"].tolist(), rows["symbol"].tolist()):
+                legs[side][strike] = symbol.decode()
+            chain = self._chains[key] = (sorted(legs[0].keys() & legs[1].keys()), legs[0], legs[1])
+        return chain
+
+    def nearest_strike(self, root, expiry, price):
+        """Listed strike closest to `price`, or None if the expiry has none."""
+        strikes = self.chain(root, expiry)[0]
+        i = bisect.bisect_left(strikes, price)
+        candidates = strikes[max(i - 1, 0):i + 1]
+        return min(candidates, key=lambda strike: abs(strike - price)) if candidates else None
+
+    def symbol(self, root, expiry, strike, option_type):
+        """Ticker of one contract, or None if it is not listed."""
+        return self.chain(root, expiry)[1 + SIDES[option_type]].get(strike)
+
+    def legs(self, instrument, ltp, width=0, day=None):
+        """Like option_legs(), from the listed contracts of the nearest expiry on or after `day`, or None."""
+        root = instrument.option_root
+        expiry = self.expiry(root, day)
+        if expiry is None:
+            return None
+        atm_strike = self.nearest_strike(root, expiry, ltp)
+        if atm_strike is None:
+            return None
+        _, calls, puts = self.chain(root, expiry)
+        strikes = band_strikes(atm_strike, width, instrument.strike_step)
+        return as_strike(atm_strike), [calls.get(s) for s in strikes], [puts.get(s) for s in strikes], expiry
+
+
+def load_symbol_master(paths, cache=None, roots=None):
+    """Symbol master of `roots` (every registered option root by default), or None without CSVs.
+
+    The memory-mapped `cache` is used when it is newer than every CSV and
+    was built for the same roots; otherwise, or if it cannot be read, the
+    CSVs are parsed and the cache is rewritten.
+    """
+    if not paths:
+        return None
+    roots = set(roots or (instrument.option_root for instrument in INSTRUMENTS.values()))
+    start = time.perf_counter()
+    master = None
+    if cache and os.path.exists(cache) and os.path.getmtime(cache) >= max(os.path.getmtime(p) for p in paths):
+        try:
+            master = SymbolMaster.load(cache)
+        except (OSError, ValueError, EOFError) as e:
+            logging.warning(f"Ignoring unreadable symbol-master cache {cache}: {e}")
+        if master is not None and master.tracked != roots:
+            master = None
+    if master is not None:
+        source = cache
+    else:
+        master = SymbolMaster.from_csv(paths, roots)
+        if cache:
+            master.save(cache)
+        source = ", ".join(str(p) for p in paths)
+    logging.info(f"Loaded {len(master)} option contracts from {source} in {time.perf_counter() - start:.3f}s")
+    for root in sorted(roots - master.roots):
+        logging.warning(f"No {root} options in the symbol master; its legs fall back to the expiry calendar")
+    return master
+
+
+def option_expiry(index_type, day=None):
+    """Expiry option_legs() quotes for an index on `day`, for analytics of rows stored without one.
+
+    The nearest listed expiry with a strike to quote when a symbol master
+    is loaded, the expiry calendar's otherwise, exactly as option_legs()
+    picks it.
+    """
+    symbol_master = get_symbol_master()
+    if symbol_master is not None:
+        root = INSTRUMENTS[index_type].option_root
+        expiry = symbol_master.expiry(root, day)
+        if expiry is not None and symbol_master.chain(root, expiry)[0]:
+            return expiry
+    resolved = expiry_calendar.resolve(index_type, day)
+    return resolved[0] if resolved else None
+
+
+def option_legs(index_type, ltp, width=0, day=None):
+    """(atm_strike, call symbols, put symbols, expiry) of the strikes ATM - width ... ATM + width.
+
+    Symbols are lowest strike first, for the nearest expiry on or after
+    `day` (today by default). With a symbol master the ATM strike and
+    expiry are the nearest listed ones and band strikes that are not listed
+    come back as None. Without one, strikes are rounded to the instrument's
+    step and named from the expiry calendar.
+    """
+    instrument = INSTRUMENTS[index_type]
+    symbol_master = get_symbol_master()
+    legs = symbol_master.legs(instrument, ltp, width, day) if symbol_master is not None else None
+    if legs is None:
+        expiry, prefix = expiry_calendar.resolve(index_type, day)
+        atm_strike = instrument.atm_strike(ltp)
+        strikes = band_strikes(atm_strike, width, instrument.strike_step)
+        legs = (atm_strike, [f"{prefix}{strike}CE" for strike in strikes],
+                [f"{prefix}{strike}PE" for strike in strikes], expiry)
+    return legs
+
+
+@functools.lru_cache(maxsize=None)
+def get_symbol_master():
+    """The symbol master of STRADDLE_SYMBOL_MASTER_FILES, loaded on the first lookup rather than at import."""
+    return load_symbol_master(
+        getattr(settings, "STRADDLE_SYMBOL_MASTER_FILES", ()),
+        getattr(settings, "STRADDLE_SYMBOL_MASTER_CACHE", None),
+    )
@@ -1,3 +1,612 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import math
+import os
+import tempfile
+import time
+import types
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from channels.db import database_sync_to_async
+from channels.layers import InMemoryChannelLayer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import expiry, metrics, wire
+from .backpressure import OutboundQueue
+from .bench import bench_pipeline, sample_payload
+from .expiry import ExpiryCalendar
+from .greeks import IST, SECONDS_PER_YEAR, bs_price, day_analytics, implied_vol
+from .history import latest_window, make_cursor, parse_cursor
+from .hub import encode_tick, hub
+from .indices import INSTRUMENTS
+from .layers import SQLiteChannelLayer
+from .leader import LeaderLock
+from .models import StraddlePrice
+from .persistence import TickWriter
+from .poller import StraddlePoller
+from .providers import RecordingProvider, SyntheticProvider
+from .ratelimit import RateLimiter
+from .recording import QuoteRecorder, ReplayDriver, read_records
+from .ringbuffer import TickRing
+from .routing import websocket_urlpatterns
+from .stream import StraddleStream
+from .symbolmaster import (
+    EXPIRY, LOT_SIZE, OPTION_TYPE, STRIKE, TICKER, UNDERLYING,
+    SymbolMaster, load_symbol_master, option_expiry, option_legs,
+)
+
+D = datetime.date
+
+
+class RateLimiterTests(SimpleTestCase):
+    async def test_throttles_to_the_bucket_rate(self):
+        limiter = RateLimiter(limits=((2, 0.1),))
+        start = time.monotonic()
+        for _ in range(4):
+            await limiter.acquire()
+        # Two tokens are there at once; the other two refill at 20 a second.
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertGreater(limiter.throttled, 0)
+
+    async def test_retries_a_429_until_it_succeeds(self):
+        responses = iter([{"code": 429}, {"code": 429}, {"s": "ok", "d": []}])
+        limiter = RateLimiter(limits=(), max_retries=3, base_backoff=0)
+
+        async def request():
+            return next(responses)
+
+        self.assertEqual(await limiter.call(request), {"s": "ok", "d": []})
+        self.assertEqual((limiter.rate_limited, limiter.dropped), (2, 0))
+
+    async def test_drops_after_max_retries(self):
+        calls = []
+        limiter = RateLimiter(limits=(), max_retries=2, base_backoff=0)
+
+        async def request():
+            calls.append(None)
+            return {"code": 429}
+
+        self.assertIsNone(await limiter.call(request))
+        self.assertEqual((len(calls), limiter.rate_limited, limiter.dropped), (3, 3, 1))
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        limiter = RateLimiter(base_backoff=1, max_backoff=5)
+        with mock.patch("straddle.ratelimit.random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual([limiter.backoff(attempt) for attempt in range(5)], [1, 2, 4, 5, 5])
+
+
+class ExpiryCalendarTests(SimpleTestCase):
+    def test_weekly_and_monthly_codes(self):
+        calendar = ExpiryCalendar()
+        self.assertEqual(calendar.expiry("NIFTY50", D(2025, 10, 6)), (D(2025, 10, 9), "25O09"))
+        # The last weekly expiry of the month trades under the monthly code.
+        self.assertEqual(calendar.expiry("NIFTY50", D(2025, 10, 24)), (D(2025, 10, 30), "25OCT"))
+        self.assertEqual(calendar.expiry("BANKEX", D(2025, 10, 1)), (D(2025, 10, 28), "25OCT"))
+        self.assertEqual(calendar.expiry("FINNIFTY", D(2025, 10, 31)), (D(2025, 11, 27), "25NOV"))
+
+    def test_holiday_moves_expiry_to_previous_trading_day(self):
+        calendar = ExpiryCalendar(holidays={D(2025, 10, 9)})
+        self.assertEqual(calendar.expiry("NIFTY50", D(2025, 10, 6)), (D(2025, 10, 8), "25O08"))
+
+    def test_holiday_shift_across_year_end(self):
+        calendar = ExpiryCalendar(holidays={D(2025, 12, 25), D(2026, 1, 1)})
+        self.assertEqual(calendar.expiry("NIFTY50", D(2025, 12, 22)), (D(2025, 12, 24), "25D24"))
+        self.assertEqual(calendar.expiry("NIFTY50", D(2025, 12, 25)), (D(2025, 12, 31), "25DEC"))
+        self.assertEqual(calendar.expiry("NIFTY50", D(2026, 1, 1)), (D(2026, 1, 8), "26108"))
+        dates = calendar._dates["NIFTY50"]
+        self.assertEqual(dates, sorted(set(dates)))
+
+    def test_prefix_uses_option_root(self):
+        calendar = ExpiryCalendar()
+        self.assertEqual(calendar.prefix("NIFTYBANK", D(2025, 10, 1)), "NSE:BANKNIFTY25OCT")
+        self.assertIsNone(calendar.prefix("UNKNOWN"))
+
+
+def tick_row(i):
+    return {"timestamp": timezone.now(), "index_name": "NIFTY50", "atm_strike": 22000 + i, "call_price": 1,
+            "put_price": 1, "straddle_price": 2, "ltp": 22000}
+
+
+class TickWriterTests(TransactionTestCase):
+    async def test_full_batch_flushes_early_and_stop_flushes_the_rest(self):
+        writer = TickWriter(batch_size=3, flush_interval=60, capacity=10)
+        writer.start()
+        for i in range(3):
+            writer.add(**tick_row(i))
+        for _ in range(200):
+            if writer.flushed:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual((writer.flushed, writer.flushes), (3, 1))
+
+        writer.add(**tick_row(3))
+        await writer.stop()
+        self.assertEqual((writer.flushed, writer.flushes, writer.queue_depth), (4, 2, 0))
+        self.assertEqual(await database_sync_to_async(StraddlePrice.objects.count)(), 4)
+
+    def test_drops_the_oldest_rows_at_capacity(self):
+        writer = TickWriter(batch_size=100, flush_interval=60, capacity=2)
+        for i in range(3):
+            writer.add(**tick_row(i))
+        self.assertEqual((writer.queue_depth, writer.dropped), (2, 1))
+        writer.flush_sync()
+        self.assertEqual(list(StraddlePrice.objects.order_by("atm_strike").values_list("atm_strike", flat=True)),
+                         [22001, 22002])
+
+
+class HistoryApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        start = timezone.now().replace(microsecond=0)
+        # Five rows share one timestamp, so the id tie-breaker matters.
+        times = [start] * 5 + [start + datetime.timedelta(seconds=i) for i in range(1, 6)]
+        StraddlePrice.objects.bulk_create(
+            StraddlePrice(index_name="NIFTY50", timestamp=ts, atm_strike=22000 + i, call_price=1, put_price=1,
+                          straddle_price=2, ltp=22000)
+            for i, ts in enumerate(times)
+        )
+
+    def test_cursor_round_trip(self):
+        ts = timezone.now()
+        self.assertEqual(parse_cursor(make_cursor(ts, 42)), (ts, 42))
+
+    def test_invalid_cursors(self):
+        for value in ("abc", "1_2_3", "x_1", "99999999999999999999999_1", "1_99999999999999999999999"):
+            with self.assertRaises(ValueError):
+                parse_cursor(value)
+
+    def test_pages_walk_every_row_once(self):
+        strikes, before = [], None
+        while True:
+            rows, before = latest_window("NIFTY50", 3, before and parse_cursor(before))
+            strikes = [row[1] for row in rows] + strikes
+            if before is None:
+                break
+        self.assertEqual(strikes, list(range(22000, 22010)))
+
+    def test_ticks_view(self):
+        page = self.client.get("/api/ticks/", {"index": "NIFTY50", "limit": 4}).json()
+        self.assertEqual(page["strike"], [22006, 22007, 22008, 22009])
+        older = self.client.get("/api/ticks/", {"index": "NIFTY50", "limit": 4, "before": page["next"]}).json()
+        self.assertEqual(older["strike"], [22002, 22003, 22004, 22005])
+        overflow = self.client.get("/api/ticks/", {"index": "NIFTY50", "before": "1_" + "9" * 30})
+        self.assertEqual(overflow.status_code, 400)
+
+    def test_history_rejects_bad_input(self):
+        self.assertEqual(self.client.get("/api/history/UNKNOWN/").status_code, 400)
+        self.assertEqual(self.client.get("/api/history/NIFTY50/", {"from": "1e20"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/history/NIFTY50/", {"from": "0"}).json()["strike"][0], 22000)
+
+
+class TickRingTests(SimpleTestCase):
+    def setUp(self):
+        self.ring = TickRing(3)
+        for t in range(5):
+            self.ring.append(t, 22000 + t, 1.0, 1.0, 2.0, 22000.0)
+
+    def test_wraps_around_keeping_the_newest_rows(self):
+        self.assertIsNone(TickRing(3).latest())
+        self.assertEqual(len(self.ring), 3)
+        self.assertEqual(self.ring.window()[:, 0].tolist(), [2, 3, 4])
+        self.assertEqual(self.ring.window(2)[:, 1].tolist(), [22003, 22004])
+        self.assertEqual(self.ring.latest()[0], 4)
+        # Windows are views into the ring, not copies.
+        self.assertTrue(np.shares_memory(self.ring.window(), self.ring._data))
+
+    def test_since(self):
+        self.assertEqual(self.ring.since(3)[:, 0].tolist(), [3, 4])
+        self.assertEqual(self.ring.since(3.5)[:, 0].tolist(), [4])
+        self.assertEqual(self.ring.since(0)[:, 0].tolist(), [2, 3, 4])
+        self.assertEqual(len(self.ring.since(10)), 0)
+
+
+def decode(frame, previous=None):
+    """Decode a FULL or DELTA frame into (kind, position, seq, timestamp, values)."""
+    kind, position, seq, timestamp = wire.HEADER.unpack_from(frame)
+    body = frame[wire.HEADER.size:]
+    if kind == wire.FULL:
+        return kind, position, seq, timestamp, list(wire.FULL_BODY.unpack(body))
+    values = list(previous)
+    (count,) = wire.DELTA_COUNT.unpack_from(body)
+    for i in range(count):
+        field, value = wire.DELTA_ENTRY.unpack_from(body, wire.DELTA_COUNT.size + i * wire.DELTA_ENTRY.size)
+        values[field] = value
+    return kind, position, seq, timestamp, values
+
+
+class WireTests(SimpleTestCase):
+    tick = {"atm_strike": 22000, "call_price": 101.5, "put_price": 98.25, "straddle_price": 199.75,
+            "ltp": 22010.4, "atm_iv": 0.14}
+
+    def test_full_frame_round_trip(self):
+        encoder = wire.TickEncoder()
+        seq, full, delta = encoder.encode("SENSEX", self.tick, 1700000000.5)
+        self.assertEqual(delta, full)
+        kind, position, frame_seq, timestamp, values = decode(full)
+        self.assertEqual((kind, position, frame_seq, timestamp), (wire.FULL, 1, seq, 1700000000.5))
+        self.assertEqual(values, [float(self.tick[field]) for field in wire.TICK_FIELDS])
+
+    def test_delta_carries_only_changed_fields(self):
+        encoder = wire.TickEncoder()
+        _, first, _ = encoder.encode("NIFTY50", self.tick, 1.0)
+        changed = dict(self.tick, call_price=102.0, straddle_price=200.25)
+        seq, full, delta = encoder.encode("NIFTY50", changed, 2.0)
+
+        kind, _, frame_seq, _, values = decode(delta, decode(first)[4])
+        self.assertEqual((kind, frame_seq), (wire.DELTA, seq))
+        self.assertEqual(wire.DELTA_COUNT.unpack_from(delta, wire.HEADER.size), (2,))
+        self.assertEqual(values, decode(full)[4])
+
+    def test_missing_data_is_nan(self):
+        _, full, _ = wire.TickEncoder().encode("NIFTY50", None, 1.0)
+        self.assertTrue(all(math.isnan(value) for value in decode(full)[4]))
+
+    def test_surface_round_trip(self):
+        surface = {"step": 50, "call": [120.5, 100.0, None], "put": [80.0, 99.5, 121.0]}
+        frame = wire.encode_surface(2, 7, 3.0, 22000, surface)
+        kind, position, seq, timestamp = wire.HEADER.unpack_from(frame)
+        atm, step, count = wire.SURFACE_HEAD.unpack_from(frame, wire.HEADER.size)
+        prices = np.frombuffer(frame, dtype="<f4", offset=wire.HEADER.size + wire.SURFACE_HEAD.size)
+
+        self.assertEqual((kind, position, seq, timestamp, atm, step, count), (wire.SURFACE, 2, 7, 3.0, 22000, 50, 3))
+        self.assertEqual(prices[:count].tolist()[:2], [120.5, 100.0])
+        self.assertTrue(math.isnan(prices[2]))
+        self.assertEqual(prices[count:].tolist(), [80.0, 99.5, 121.0])
+
+
+@override_settings(STRADDLE_EMBEDDED_POLLER=False)
+class ConsumerTests(TransactionTestCase):
+    async def test_subscribe_and_unsubscribe(self):
+        encoder = wire.TickEncoder()
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), "/ws/straddle/NIFTY50/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual((snapshot["type"], list(snapshot["indices"])), ("snapshot", ["NIFTY50"]))
+
+        hub.publish(encode_tick(encoder, "SENSEX", sample_payload()))
+        self.assertTrue(await communicator.receive_nothing())
+        hub.publish(encode_tick(encoder, "NIFTY50", sample_payload()))
+        self.assertIn("nifty", await communicator.receive_json_from())
+
+        await communicator.send_json_to({"action": "subscribe", "indices": ["SENSEX"]})
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual((snapshot["type"], list(snapshot["indices"])), ("snapshot", ["SENSEX"]))
+        hub.publish(encode_tick(encoder, "SENSEX", sample_payload()))
+        self.assertIn("sensex", await communicator.receive_json_from())
+
+        await communicator.send_json_to({"action": "unsubscribe", "indices": ["NIFTY50"]})
+        self.assertTrue(await communicator.receive_nothing())
+        hub.publish(encode_tick(encoder, "NIFTY50", sample_payload()))
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.disconnect()
+        self.assertEqual(hub.clients, 0)
+
+    async def test_unknown_indices_are_rejected(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), "/ws/straddle/FOO,BAR/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(await communicator.receive_output(), {"type": "websocket.close", "code": 4400})
+        self.assertEqual(hub.clients, 0)
+        await communicator.disconnect()
+
+
+class OutboundQueueTests(SimpleTestCase):
+    async def test_coalesces_to_latest_per_key(self):
+        sent = []
+
+        async def send(item):
+            sent.append(item)
+
+        queue = OutboundQueue(send, max_depth=3)
+        for i in range(3):
+            queue.put("NIFTY50", i)
+        queue.put("SENSEX", "s")
+        self.assertEqual((len(queue), queue.coalesced, queue.dropped), (2, 2, 0))
+
+        queue.start()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await queue.close()
+        self.assertEqual(sent, [2, "s"])
+
+    async def test_drops_oldest_keys_beyond_depth(self):
+        queue = OutboundQueue(None, max_depth=2)
+        for key in ("a", "b", "c"):
+            queue.put(key, key)
+        self.assertEqual((len(queue), queue.dropped), (2, 1))
+        self.assertEqual([item for _, item in queue._items], ["b", "c"])
+
+
+class MultiWorkerTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+
+    async def test_sqlite_layer_is_shared_by_separate_instances(self):
+        path = os.path.join(self.tmp, "channels.sqlite3")
+        sender, receiver = SQLiteChannelLayer(path), SQLiteChannelLayer(path)
+        channel = await receiver.new_channel()
+        await receiver.group_add("straddle.NIFTY50", channel)
+        await sender.group_send("straddle.NIFTY50", {"type": "straddle.tick", "full": b"\x01\x02"})
+        await sender.group_send("straddle.SENSEX", {"type": "straddle.tick", "full": b"\x03"})
+
+        message = await asyncio.wait_for(receiver.receive(channel), 5)
+        self.assertEqual(message, {"type": "straddle.tick", "full": b"\x01\x02"})
+        self.assertIsNone(await receiver._run(receiver._receive_one, channel))
+        await sender.close()
+        await receiver.close()
+
+    def test_only_one_leader_at_a_time(self):
+        path = os.path.join(self.tmp, "straddle_poller.lock")
+        first, second = LeaderLock(path), LeaderLock(path)
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+    async def test_leader_polls_the_union_of_watched_indices(self):
+        layer = InMemoryChannelLayer()
+        with override_settings(STRADDLE_LEADER_LOCK=os.path.join(self.tmp, "straddle_poller.lock")):
+            leader, follower = StraddlePoller(), StraddlePoller()
+        follower.shared.worker = "follower"
+        leader.shared.start(layer)
+        await asyncio.sleep(0.01)
+        self.assertEqual(leader.active_indices, [])
+
+        leader.watch(["NIFTY50"])
+        follower.watch(["SENSEX"])
+        await follower.shared.heartbeat(layer, +follower.watchers)
+        await asyncio.sleep(0.01)
+        self.assertEqual(leader.active_indices, ["NIFTY50", "SENSEX"])
+
+        # A worker that stops withdraws its indices; one that vanishes expires after the TTL.
+        await follower.shared.stop(layer)
+        await asyncio.sleep(0.01)
+        self.assertEqual(leader.active_indices, ["NIFTY50"])
+        leader.shared.ttl = 0
+        leader.shared.receive({"worker": "gone", "indices": ["FINNIFTY"]})
+        self.assertEqual(leader.active_indices, ["NIFTY50"])
+        await leader.shared.stop(layer)
+
+
+class FakeFeed:
+    def __init__(self):
+        self.requests = []
+
+    async def subscribe(self, symbols):
+        self.requests.append(("subscribe", symbols))
+
+    async def unsubscribe(self, symbols):
+        self.requests.append(("unsubscribe", symbols))
+
+
+class StreamTests(SimpleTestCase):
+    def setUp(self):
+        self.poller = StraddlePoller()
+        self.rows = []
+        self.poller.writer.write = self.rows.extend
+        self.feed = FakeFeed()
+        self.stream = StraddleStream(self.poller, self.feed, ["NIFTY50"])
+        self.prefix = expiry.expiry_calendar.prefix("NIFTY50")
+
+    async def test_roll_swaps_legs_only_outside_the_band(self):
+        await self.stream.roll("NIFTY50", 22010.0)
+        legs = [f"{self.prefix}22000CE", f"{self.prefix}22000PE"]
+        self.assertEqual(self.feed.requests, [("subscribe", legs)])
+
+        # 20 points from 22000 is inside the 0.6-step band.
+        await self.stream.roll("NIFTY50", 22020.0)
+        self.assertEqual(len(self.feed.requests), 1)
+
+        await self.stream.roll("NIFTY50", 22040.0)
+        new_legs = [f"{self.prefix}22050CE", f"{self.prefix}22050PE"]
+        self.assertEqual(self.feed.requests[1:], [("subscribe", new_legs), ("unsubscribe", legs)])
+        self.assertEqual((self.stream.rolls, self.stream.legs["NIFTY50"]), (1, (22050, *new_legs)))
+        self.assertNotIn(legs[0], self.stream.routes)
+
+    async def test_emits_at_most_once_per_interval(self):
+        layer = InMemoryChannelLayer()
+        self.poller.interval = 60
+        spot = INSTRUMENTS["NIFTY50"].spot_symbol
+        await self.stream.on_message(layer, {"symbol": spot, "ltp": 22010.0})
+        call, put = self.stream.legs["NIFTY50"][1:]
+        for i in range(10):
+            for symbol, ltp in ((call, 100.0 + i), (put, 90.0), (spot, 22010.0 + i)):
+                await self.stream.on_message(layer, {"symbol": symbol, "ltp": ltp})
+        await self.stream.emit_due(layer)
+        self.assertEqual((self.stream.recomputed, self.stream.emits), (29, 1))
+
+        # Once the interval has passed, the latest straddle goes out and nothing is pending.
+        self.stream.emitted["NIFTY50"] -= 60
+        await self.stream.emit_due(layer)
+        await self.stream.emit_due(layer)
+        await self.poller.writer.flush()
+        self.assertEqual(len(self.rows), 2)
+        self.assertEqual((self.rows[1].call_price, self.rows[1].ltp), (109.0, 22019.0))
+        self.assertEqual(len(self.poller.history["NIFTY50"]), 2)
+
+
+class FrozenDate(datetime.date):
+    day = None
+
+    @classmethod
+    def today(cls):
+        return cls.day
+
+
+class RecordReplayTests(TransactionTestCase):
+    def test_replays_a_past_session_as_of_its_recorded_time(self):
+        session_day = timezone.localdate() - datetime.timedelta(days=40)
+        session_start = datetime.datetime.combine(session_day, datetime.time(10), timezone.get_current_timezone())
+        index_types = ["NIFTY50", "NIFTYBANK"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            live_path = os.path.join(tmp, "live.jsonl")
+            # Record three ticks while the calendar (and the simulated exchange) think it is session_day.
+            FrozenDate.day = session_day
+            shim = types.SimpleNamespace(date=FrozenDate, timedelta=datetime.timedelta)
+            with mock.patch.object(expiry, "datetime", shim):
+                recorder = QuoteRecorder(live_path)
+                poller = StraddlePoller(provider=RecordingProvider(SyntheticProvider(latency=0, jitter=0, seed=1),
+                                                                   recorder))
+                for _ in range(3):
+                    asyncio.run(poller.fetch_all(index_types))
+                recorder.close()
+
+            # Stamp the records with session times; the file name does not say it is gzipped.
+            path = os.path.join(tmp, "session.jsonl")
+            recorder = QuoteRecorder(path)
+            for i, record in enumerate(read_records(live_path)):
+                recorder.record(record["request"], record["response"], t=session_start.timestamp() + i)
+            recorder.close()
+
+            driver = ReplayDriver(path, speed=None)
+            asyncio.run(driver.run())
+
+        self.assertEqual(driver.ticks, 3)
+        rows = StraddlePrice.objects.order_by("timestamp", "index_name")
+        self.assertEqual(rows.count(), 6)
+        self.assertEqual(rows[0].timestamp, session_start)
+        self.assertEqual(rows[5].timestamp, session_start + datetime.timedelta(seconds=4))
+
+    def test_missing_recording_is_a_command_error(self):
+        with self.assertRaisesMessage(CommandError, "No recorded quotes log"):
+            call_command("replay_quotes", os.path.join(tempfile.gettempdir(), "missing.jsonl.gz"))
+
+
+class PipelineBenchTests(TransactionTestCase):
+    def test_pipeline_times_every_stage(self):
+        (result,) = bench_pipeline(ticks=3, index_types=["NIFTY50", "SENSEX"])
+        self.assertEqual((result["ticks"], result["indices"], result["rows_written"]), (3, 2, 6))
+        for stage in ("spot_fetch", "option_fetch", "compute", "serialize", "send", "db_write", "tick"):
+            self.assertGreater(result["stages"][stage]["n"], 0)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram("test_seconds", "Test.", ["kind"], buckets=(0.1, 1))
+        self.addCleanup(metrics.REGISTRY.remove, histogram)
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, "spot")
+        self.assertEqual(histogram.collect()[2:], [
+            'test_seconds_bucket{kind="spot",le="0.1"} 1',
+            'test_seconds_bucket{kind="spot",le="1"} 2',
+            'test_seconds_bucket{kind="spot",le="+Inf"} 3',
+            'test_seconds_sum{kind="spot"} 5.55',
+            'test_seconds_count{kind="spot"} 3',
+        ])
+
+    def test_metrics_view_exports_pipeline_counters(self):
+        with mock.patch("straddle.poller.poller.writer.flushed", 7):
+            response = self.client.get("/metrics")
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        lines = response.content.decode().splitlines()
+        self.assertIn("straddle_db_rows_flushed_total 7", lines)
+        self.assertIn("# TYPE straddle_db_queue_depth gauge", lines)
+        for name in ("straddle_quotes_dropped_total", "straddle_frames_sent_total", "straddle_hub_published_total"):
+            self.assertIn(f"# TYPE {name} counter", lines)
+
+
+class ImpliedVolTests(SimpleTestCase):
+    def test_round_trip(self):
+        strikes = np.array([18000.0, 21000.0, 22000.0, 23000.0, 26000.0])
+        vols = np.array([0.08, 0.15, 0.3, 0.6])[:, None]
+        years = 20 / 365
+        for is_call in (True, False):
+            prices = bs_price(22000.0, strikes, years, vols, is_call)
+            solved = implied_vol(prices, 22000.0, strikes, years, is_call)
+            # Only options with some time value pin down a volatility.
+            intrinsic = np.maximum(22000.0 - strikes if is_call else strikes - 22000.0, 0)
+            priced = prices - intrinsic > 1
+            np.testing.assert_allclose(solved[priced], np.broadcast_to(vols, prices.shape)[priced], atol=1e-4)
+
+    def test_prices_outside_bounds_are_nan(self):
+        # Below intrinsic value, above the spot, and with no time left.
+        solved = implied_vol([900.0, 23000.0, 100.0], 22000.0, [21000.0, 22000.0, 22000.0], [0.05, 0.05, 0.0], True)
+        self.assertTrue(np.isnan(solved).all())
+
+
+def contract_row(root, expiry, strike, option_type, lot_size=75):
+    """One row laid out like the Fyers NSE_FO.csv symbol master."""
+    row = [""] * 21
+    timestamp = datetime.datetime.combine(expiry, datetime.time(15, 30), IST).timestamp()
+    ticker = f"NSE:{root}{expiry:%y%m%d}{strike}{option_type}"
+    row[LOT_SIZE], row[EXPIRY], row[TICKER] = str(lot_size), str(int(timestamp)), ticker
+    row[UNDERLYING], row[STRIKE], row[OPTION_TYPE] = root, str(strike), option_type
+    return row
+
+
+class SymbolMasterTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.csv_path = os.path.join(tmp.name, "NSE_FO.csv")
+        self.cache = os.path.join(tmp.name, "symbol_master.npy")
+        rows = [
+            contract_row(root, expiry, strike, option_type)
+            for root in ("NIFTY", "RELIANCE")
+            for expiry in (D(2025, 10, 9), D(2025, 10, 16))
+            for strike in range(21950, 22150, 50)
+            for option_type in ("CE", "PE")
+            # The 22100 put of the later expiry is not listed.
+            if (expiry, strike, option_type) != (D(2025, 10, 16), 22100, "PE")
+        ]
+        rows.append(contract_row("NIFTY", D(2025, 10, 30), 0, "XX"))
+        rows.append(contract_row("NIFTY", D(2025, 10, 30), 22000, "CE", lot_size="abc"))
+        with open(self.csv_path, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+    def test_legs_of_the_nearest_listed_expiry(self):
+        master = SymbolMaster.from_csv([self.csv_path], {"NIFTY"})
+        self.assertEqual((len(master), master.roots), (15, {"NIFTY"}))
+
+        atm, calls, puts, expiry = master.legs(INSTRUMENTS["NIFTY50"], 22040.0, 1, D(2025, 10, 10))
+        self.assertEqual((atm, expiry), (22050, D(2025, 10, 16)))
+        self.assertEqual(calls, ["NSE:NIFTY25101622000CE", "NSE:NIFTY25101622050CE", "NSE:NIFTY25101622100CE"])
+        self.assertEqual(puts, ["NSE:NIFTY25101622000PE", "NSE:NIFTY25101622050PE", None])
+        # 22100 has no put, so it is never the ATM strike.
+        self.assertEqual(master.legs(INSTRUMENTS["NIFTY50"], 22140.0, day=D(2025, 10, 10))[0], 22050)
+        self.assertIsNone(master.legs(INSTRUMENTS["NIFTY50"], 22040.0, day=D(2025, 11, 1)))
+
+    def test_cache_is_reused_and_rebuilt(self):
+        roots = {"NIFTY", "BANKNIFTY"}
+        built = load_symbol_master([self.csv_path], self.cache, roots)
+        with mock.patch.object(SymbolMaster, "from_csv", side_effect=AssertionError("parsed the CSVs")):
+            cached = load_symbol_master([self.csv_path], self.cache, roots)
+        self.assertIsInstance(cached.contracts, np.memmap)
+        self.assertEqual((len(cached), cached.tracked, cached.roots), (len(built), roots, {"NIFTY"}))
+
+        # Other roots, or a cache that cannot be read, fall back to the CSVs.
+        self.assertEqual(load_symbol_master([self.csv_path], self.cache, {"RELIANCE"}).roots, {"RELIANCE"})
+        with open(self.cache, "wb") as f:
+            f.write(b"\x93NUMPY truncated")
+        self.assertEqual(len(load_symbol_master([self.csv_path], self.cache, roots)), len(built))
+        self.assertEqual(len(SymbolMaster.load(self.cache)), len(built))
+        self.assertEqual(os.listdir(os.path.dirname(self.cache)), ["NSE_FO.csv", "symbol_master.npy"])
+
+    def test_day_analytics_uses_the_quoted_expiry(self):
+        # The listed weekly expiry is a Tuesday; the calendar still says Thursday 2025-10-16.
+        with open(self.csv_path, "a", newline="") as f:
+            csv.writer(f).writerows(contract_row("NIFTY", D(2025, 10, 14), 22000, side) for side in ("CE", "PE"))
+        master = SymbolMaster.from_csv([self.csv_path], {"NIFTY"})
+        at = datetime.datetime(2025, 10, 10, 10, tzinfo=IST)
+        StraddlePrice.objects.create(index_name="NIFTY50", timestamp=at, atm_strike=22000, call_price=150,
+                                     put_price=140, straddle_price=290, ltp=22010)
+
+        with mock.patch("straddle.symbolmaster.get_symbol_master", return_value=master):
+            self.assertEqual(option_legs("NIFTY50", 22010.0, day=D(2025, 10, 10))[3], D(2025, 10, 14))
+            self.assertEqual(option_expiry("NIFTY50", D(2025, 10, 10)), D(2025, 10, 14))
+            years = day_analytics(D(2025, 10, 10))["years"]
+        close = datetime.datetime(2025, 10, 14, 15, 30, tzinfo=IST)
+        self.assertAlmostEqual(years[0] * SECONDS_PER_YEAR, (close - at).total_seconds(), places=3)
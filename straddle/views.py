@@ -1,7 +1,114 @@
+import datetime
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .models import StraddlePrice
+from .indices import INDEX_KEYS
+from .history import columnar, latest_window, parse_cursor, HISTORY_FIELDS
+from . import metrics as straddle_metrics
+
+
+def parse_time(value):
+    """Parse an epoch-seconds or ISO 8601 query parameter into an aware datetime."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = None
+    if seconds is not None:
+        try:
+            return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            raise ValueError(f"Invalid time: {value}")
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid time: {value}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
 
 def index(request):
-    return render(request, 'straddle/index.html', {"straddle_prices": StraddlePrice.objects.all()})
+    limit = getattr(settings, "STRADDLE_INITIAL_WINDOW", 360)
+    initial_history = {
+        index_name: columnar(latest_window(index_name, limit)[0])
+        for index_name in INDEX_KEYS
+    }
+    return render(request, 'straddle/index.html', {"initial_history": initial_history})
+
+
+def ticks(request):
+    """Keyset-paginated ticks for ?index=, newest page first, walking back via ?before=."""
+    index_name = request.GET.get("index")
+    if index_name not in INDEX_KEYS:
+        return JsonResponse({"error": f"Unknown index: {index_name}"}, status=400)
+
+    try:
+        before = parse_cursor(request.GET["before"]) if request.GET.get("before") else None
+        limit = min(int(request.GET.get("limit", 500)), getattr(settings, "STRADDLE_PAGE_MAX_ROWS", 5000))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    rows, cursor = latest_window(index_name, max(limit, 1), before)
+    data = columnar(rows)
+    data["index"] = index_name
+    data["next"] = cursor
+    return JsonResponse(data)
+
+
+def history(request, index_name):
+    """Columnar straddle history for one index between ?from= and ?to=."""
+    if index_name not in INDEX_KEYS:
+        return JsonResponse({"error": f"Unknown index: {index_name}"}, status=400)
+
+    try:
+        start = parse_time(request.GET.get("from"))
+        end = parse_time(request.GET.get("to"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if start is None:
+        start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    rows = StraddlePrice.objects.filter(index_name=index_name, timestamp__gte=start)
+    if end is not None:
+        rows = rows.filter(timestamp__lte=end)
+
+    limit = getattr(settings, "STRADDLE_HISTORY_MAX_ROWS", 100000)
+    rows = rows.order_by("timestamp").values_list(*HISTORY_FIELDS)[:limit]
+
+    data = columnar(rows)
+    data["index"] = index_name
+    return JsonResponse(data)
+
+
+def metrics(request):
+    """Prometheus scrape endpoint for this process's straddle metrics."""
+    # Importing these registers the poller's, hub's and send queues' scrape-time metrics.
+    from . import backpressure, poller  # noqa: F401
+    return HttpResponse(straddle_metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def surface(request, index_name):
+    """Recent strike x time straddle surface of an index, from this process's memory.
+
+    /api/surface/<index>/?limit=N returns the newest N ticks (default 300)
+    of the ATM±STRADDLE_STRIKE_BAND band, one row per tick.
+    """
+    from .poller import poller
 
+    if index_name not in INDEX_KEYS:
+        return JsonResponse({"error": f"Unknown index: {index_name}"}, status=400)
+    if index_name not in poller.surfaces:
+        return JsonResponse({"error": "Strike bands are disabled (STRADDLE_STRIKE_BAND = 0)"}, status=404)
+    try:
+        limit = int(request.GET.get("limit", 300))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
+    data = poller.surfaces[index_name].as_json(max(limit, 0))
+    data["index"] = index_name
+    return JsonResponse(data)
@@ -0,0 +1,92 @@
+import math
+import struct
+from .indices import INDEX_KEYS
+
+
+# Per-index values carried in binary frames, in schema order.
+TICK_FIELDS = ("atm_strike", "call_price", "put_price", "straddle_price", "ltp", "atm_iv")
+
+FULL = 0
+DELTA = 1
+SURFACE = 2
+
+# kind, index position (schema order), per-index sequence number, epoch timestamp
+HEADER = struct.Struct("<BBId")
+FULL_BODY = struct.Struct(f"<{len(TICK_FIELDS)}d")
+# field position, value
+DELTA_ENTRY = struct.Struct("<Bd")
+DELTA_COUNT = struct.Struct("<B")
+# ATM strike, strike step, strikes in the band; followed by that many float32 calls, then puts
+SURFACE_HEAD = struct.Struct("<dHB")
+
+
+def schema(index_keys=INDEX_KEYS):
+    """Describe the binary layout; sent once as JSON when a binary client connects."""
+    return {
+        "type": "schema",
+        "encoding": "binary",
+        "indices": list(index_keys.values()),
+        "fields": list(TICK_FIELDS),
+        "header": HEADER.format,
+        "delta_entry": DELTA_ENTRY.format,
+        "surface_head": SURFACE_HEAD.format,
+    }
+
+
+def encode_surface(position, seq, timestamp, atm_strike, surface):
+    """Frame one tick's strike band: the ATM strike, then the call and put prices (NaN if unquoted)."""
+    prices = [math.nan if value is None else value for value in surface["call"] + surface["put"]]
+    count = len(surface["call"])
+    return b"".join([
+        HEADER.pack(SURFACE, position, seq, timestamp),
+        SURFACE_HEAD.pack(atm_strike, surface["step"], count),
+        struct.pack(f"<{2 * count}f", *prices),
+    ])
+
+
+def changed(old, new):
+    return old != new and not (math.isnan(old) and math.isnan(new))
+
+
+class TickEncoder:
+    """Encode one index's tick as a packed float64 frame.
+
+    A full frame carries every field of the index (NaN when it had no data
+    this tick). A delta frame carries only the (field, value) pairs that
+    differ from that index's previous tick. Each index has its own sequence
+    number so a receiver can tell whether a delta applies to the state it
+    already holds.
+    """
+
+    def __init__(self, index_keys=INDEX_KEYS):
+        self.positions = {index_type: i for i, index_type in enumerate(index_keys)}
+        self.seq = dict.fromkeys(index_keys, 0)
+        self._last = {}
+
+    def values(self, data):
+        values = []
+        for field in TICK_FIELDS:
+            value = data.get(field) if data else None
+            values.append(math.nan if value is None else float(value))
+        return values
+
+    def encode(self, index_type, data, timestamp):
+        """Return (seq, full, delta) frames for an index's next tick."""
+        seq = self.seq[index_type] = (self.seq[index_type] + 1) & 0xFFFFFFFF
+        position = self.positions[index_type]
+        values = self.values(data)
+
+        full = HEADER.pack(FULL, position, seq, timestamp) + FULL_BODY.pack(*values)
+        last = self._last.get(index_type)
+        if last is None:
+            delta = full
+        else:
+            entries = [(field, value) for field, (old, value) in enumerate(zip(last, values)) if changed(old, value)]
+            delta = b"".join([
+                HEADER.pack(DELTA, position, seq, timestamp),
+                DELTA_COUNT.pack(len(entries)),
+                *(DELTA_ENTRY.pack(field, value) for field, value in entries),
+            ])
+
+        self._last[index_type] = values
+        return seq, full, delta
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,11 +54,67 @@ INSTALLED_APPS = [
 ASGI_APPLICATION = 'straddle_project.asgi.application'
 
 # Configure Django Channels for WebSockets
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
-    },
+# memory: a single ASGI process. sqlite: several worker processes on one host.
+# redis: several hosts (needs channels_redis and REDIS_URL).
+STRADDLE_CHANNEL_LAYER = os.getenv("STRADDLE_CHANNEL_LAYER", "memory")
+if STRADDLE_CHANNEL_LAYER == "redis":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [os.getenv("REDIS_URL", "redis://127.0.0.1:6379")]},
+        },
+    }
+elif STRADDLE_CHANNEL_LAYER == "sqlite":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "straddle.layers.SQLiteChannelLayer",
+            "CONFIG": {"path": BASE_DIR / "channels.sqlite3"},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        },
+    }
+
+# Straddle market-data poller
+# True: each ASGI process polls while it has WebSocket clients. False: a separate
+# `manage.py run_straddle_feed` worker polls and publishes over a cross-process channel layer.
+STRADDLE_EMBEDDED_POLLER = os.getenv("STRADDLE_EMBEDDED_POLLER", "true").lower() in ("1", "true", "yes")
+# With a cross-process channel layer every worker fans out ticks, but only the one holding
+# this file lock polls Fyers; the others take over if it exits. None polls in every process.
+STRADDLE_LEADER_LOCK = None if STRADDLE_CHANNEL_LAYER == "memory" else BASE_DIR / "straddle_poller.lock"
+STRADDLE_WATCH_TTL = 15  # seconds a worker's heartbeat of its clients' indices keeps them polled by the leader
+STRADDLE_STREAM_FEED = "fyers"  # run_straddle_feed --engine stream source: "fyers" or a simulator's host:port
+# Where quotes come from: "fyers" (live API), "replay" (OPTIONS: path of a recorded .jsonl[.gz]),
+# "synthetic" (OPTIONS: latency, jitter, rate_limit_rate, error_rate, volatility, seed) or a dotted path.
+STRADDLE_QUOTE_PROVIDER = {
+    "BACKEND": os.getenv("STRADDLE_QUOTE_PROVIDER", "fyers"),
+    "OPTIONS": {},
 }
+STRADDLE_RECORD_QUOTES = os.getenv("STRADDLE_RECORD_QUOTES")  # .jsonl.gz to append raw quote responses to
+STRADDLE_BATCH_QUOTES = True  # two batched quotes calls per tick instead of one pair per index
+STRADDLE_FETCH_WORKERS = 6  # max threads used for blocking quote and DB calls
+STRADDLE_FETCH_TIMEOUT = 5  # seconds before a single fetch or save is abandoned
+STRADDLE_RATE_LIMITS = [(10, 1), (200, 60)]  # Fyers quotas as (requests, seconds)
+STRADDLE_MAX_RETRIES = 3  # retries with jittered backoff after an HTTP 429
+STRADDLE_HOLIDAYS_FILE = None  # text file of YYYY-MM-DD exchange holidays, one per line
+STRADDLE_INSTRUMENTS_FILE = None  # JSON list of instrument records replacing the built-in index registry
+STRADDLE_SYMBOL_MASTER_FILES = []  # local Fyers symbol-master CSVs (e.g. NSE_FO.csv, BSE_FO.csv) to resolve option legs from
+STRADDLE_SYMBOL_MASTER_CACHE = BASE_DIR / "symbol_master.npy"  # memory-mapped index rebuilt when a CSV is newer
+STRADDLE_DB_BATCH_SIZE = 60  # buffered ticks that trigger an early bulk insert
+STRADDLE_DB_FLUSH_MS = 1000  # max time a tick waits in the buffer before it is written
+STRADDLE_DB_BUFFER_CAPACITY = 10000  # oldest ticks are dropped beyond this many
+STRADDLE_HISTORY_DEPTH = 23400  # in-memory ticks kept per index (a full session at 1 Hz)
+STRADDLE_HISTORY_MAX_ROWS = 100000  # row cap for one /api/history/ response
+STRADDLE_INITIAL_WINDOW = 360  # latest ticks per index embedded in the dashboard page
+STRADDLE_PAGE_MAX_ROWS = 5000  # row cap for one /api/ticks/ page
+STRADDLE_SNAPSHOT_MINUTES = 10  # history sent to a WebSocket client when it connects
+STRADDLE_STRIKE_BAND = 0  # also quote this many strikes either side of ATM and stream the band
+STRADDLE_QUOTES_SYMBOL_LIMIT = 50  # max symbols in one quotes call; larger requests are split
+STRADDLE_SURFACE_DEPTH = 3600  # strike-band ticks kept in memory per index
+STRADDLE_SEND_QUEUE_DEPTH = 32  # queued frames per client before coalescing to the latest per index
 
 
 MIDDLEWARE = [
@@ -1,8 +1,12 @@
 from django.contrib import admin
 from django.urls import path
-from straddle.views import index
+from straddle.views import index, history, ticks, metrics, surface
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', index, name='index'),
+    path('api/history/<str:index_name>/', history, name='history'),
+    path('api/ticks/', ticks, name='ticks'),
+    path('api/surface/<str:index_name>/', surface, name='surface'),
+    path('metrics', metrics, name='metrics'),
 ]